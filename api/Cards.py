@@ -0,0 +1,142 @@
+"""
+ Card metadata in dense arrays indexed by `CardTemplate` id, so questions about whole armies take one array operation,
+ e.g. `cards.type[cards.rows(columns.card_id)] == CardType.Unit`.
+ The data is read from a CSV file with the header `template,name,type,power_cost,white,shadow,nature,frost,fire`,
+ `type` is a `CardType` name, the orb columns are the tokens of each color on the card (`white` are the colorless ones),
+ empty cells are unknown.
+ No data file comes with the api, without one only the names of `CardTemplate` are known, and questions about costs
+ or types raise `ValueError` instead of answering with NaN and `CardType.Unknown`.
+"""
+import csv
+from enum import IntEnum
+from typing import Optional, Tuple
+
+import numpy as np
+
+from api.CardTemplate import CardTemplate
+from api.Types import OrbColor, Upgrade
+
+UPGRADE_STEP = int(Upgrade.U1)
+"""
+ `CardId` is the `CardTemplate` id plus `UPGRADE_STEP` times the upgrade level.
+"""
+ORB_COLORS = (OrbColor.White, OrbColor.Shadow, OrbColor.Nature, OrbColor.Frost, OrbColor.Fire)
+"""
+ Columns of `CardTable.orbs`, the column index is the `OrbColor` value.
+"""
+
+
+class CardType(IntEnum):
+    Unknown = 0,
+    Unit = 1,
+    Building = 2,
+    Spell = 3,
+
+
+def split(card_ids) -> Tuple[np.ndarray, np.ndarray]:
+    """
+     `CardTemplate` ids and upgrade levels (0 to 3) of an array of `CardId`s.
+    """
+    upgrade, template = np.divmod(np.asarray(card_ids, dtype=np.int64), UPGRADE_STEP)
+    return template, upgrade
+
+
+def combine(templates, upgrades) -> np.ndarray:
+    """
+     `CardId`s of arrays of `CardTemplate` ids and upgrade levels, the array version of `Helpers.new_card_id`.
+    """
+    return np.asarray(templates, dtype=np.int64) + np.asarray(upgrades, dtype=np.int64) * UPGRADE_STEP
+
+
+class CardTable:
+    """
+     Row `i` of every array describes the template with id `i`, row 0 (`NotACard`) is used for unknown ids.
+    """
+
+    def __init__(self, size: int = max(CardTemplate) + 1):
+        self.loaded = False
+        """
+         Data was read from a file by `load`.
+        """
+        self.known = np.zeros(size, dtype=bool)
+        """
+         Ids of `CardTemplate` members, or listed in the data file.
+        """
+        self.name = np.full(size, "", dtype=object)
+        self.type = np.zeros(size, dtype=np.int8)
+        """
+         `CardType` code.
+        """
+        self.power_cost = np.full(size, np.nan, dtype=np.float32)
+        self.orbs = np.full((size, len(ORB_COLORS)), -1, dtype=np.int8)
+        """
+         Tokens of each of `ORB_COLORS`, -1 when unknown.
+        """
+        for template in CardTemplate:
+            self.known[template] = True
+            self.name[template] = template.name
+        self.known[CardTemplate.NotACard] = False
+
+    @staticmethod
+    def load(path: str) -> "CardTable":
+        """
+         Table of the data file at `path`.
+        """
+        with open(path, newline="", encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+        size = max([max(CardTemplate)] + [int(row["template"]) for row in rows]) + 1
+        table = CardTable(size)
+        table.loaded = True
+        for row in rows:
+            i = int(row["template"])
+            table.known[i] = True
+            if row.get("name"):
+                table.name[i] = row["name"]
+            if row.get("type"):
+                table.type[i] = CardType[row["type"]]
+            if row.get("power_cost"):
+                table.power_cost[i] = float(row["power_cost"])
+            for color in ORB_COLORS:
+                if row.get(color.name.lower()):
+                    table.orbs[i, color] = int(row[color.name.lower()])
+        return table
+
+    def rows(self, card_ids) -> np.ndarray:
+        """
+         Rows of an array of `CardId`s (of any upgrade), 0 for unknown templates.
+        """
+        template = np.asarray(card_ids, dtype=np.int64) % UPGRADE_STEP
+        rows = np.where(template < len(self.known), template, 0)
+        return np.where(self.known[rows], rows, 0)
+
+    def template(self, card_id: int) -> Optional[CardTemplate]:
+        """
+         `CardTemplate` of one `CardId`, `None` instead of an error for ids missing in the enum.
+        """
+        try:
+            return CardTemplate(card_id % UPGRADE_STEP)
+        except ValueError:
+            return None
+
+    def _require_data(self):
+        if not self.loaded:
+            raise ValueError("No card data, read it with `CardTable.load`")
+
+    def total_power_cost(self, card_ids) -> float:
+        """
+         Power cost of all the cards, `ValueError` if the cost of any of them is unknown.
+        """
+        self._require_data()
+        card_ids = np.asarray(card_ids, dtype=np.int64)
+        costs = self.power_cost[self.rows(card_ids)]
+        unknown = np.isnan(costs)
+        if unknown.any():
+            raise ValueError(f"Unknown power cost of cards {sorted(set(card_ids[unknown].tolist()))}")
+        return float(costs.sum())
+
+    def composition(self, card_ids) -> np.ndarray:
+        """
+         Number of cards of each `CardType`, indexed by its code, cards without a type are counted as `Unknown`.
+        """
+        self._require_data()
+        return np.bincount(self.type[self.rows(card_ids)], minlength=len(CardType))
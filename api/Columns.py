@@ -0,0 +1,204 @@
+"""
+ Struct of arrays snapshot of the entities of one tick, for vectorised bot logic, e.g.
+ `columns.id[(columns.kind == KIND_CODES["Squad"]) & (columns.player_entity_id == my_id)]`.
+"""
+from math import nan
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from api.Lazy import LazyModel
+from api.Types import APIEntity, APIEntitySpecificTags, AspectHealth, AspectTags
+
+NO_PLAYER = -1
+"""
+ `player_entity_id` of entities without owner.
+"""
+
+KINDS: List[str] = list(APIEntitySpecificTags.variants)
+"""
+ `APIEntitySpecific` tags, index is the code used in `EntityColumns.kind`.
+"""
+KIND_CODES: Dict[str, int] = {tag: code for code, tag in enumerate(KINDS)}
+_KIND_CODES_BY_CLASS: Dict[type, int] = {cls: KIND_CODES[tag] for tag, cls in APIEntitySpecificTags.variants.items()}
+
+
+class EntityColumns:
+    """
+     One array per field, row `i` of every array describes the same entity.
+    """
+    id: np.ndarray
+    x: np.ndarray
+    y: np.ndarray
+    """
+     Height.
+    """
+    z: np.ndarray
+    player_entity_id: np.ndarray
+    """
+     `NO_PLAYER` when not owned.
+    """
+    job: np.ndarray
+    """
+     `Job` code.
+    """
+    kind: np.ndarray
+    """
+     `APIEntitySpecific` code, see `KIND_CODES`.
+    """
+    current_hp: np.ndarray
+    """
+     From `AspectHealth`, `nan` when the entity does not have it.
+    """
+    cap_current_max: np.ndarray
+    """
+     From `AspectHealth`, `nan` when the entity does not have it.
+    """
+    card_id: np.ndarray
+    """
+     Card of squads and buildings, 0 for others.
+    """
+    squad_size: np.ndarray
+    """
+     0 for non squads.
+    """
+
+    def __init__(self, id: Sequence[int], x: Sequence[float], y: Sequence[float], z: Sequence[float],
+                 player_entity_id: Sequence[int], job: Sequence[int], kind: Sequence[int],
+                 current_hp: Sequence[float], cap_current_max: Sequence[float], card_id: Sequence[int],
+                 squad_size: Sequence[int]):
+        self.id = np.array(id, dtype=np.int64)
+        self.x = np.array(x, dtype=np.float64)
+        self.y = np.array(y, dtype=np.float64)
+        self.z = np.array(z, dtype=np.float64)
+        self.player_entity_id = np.array(player_entity_id, dtype=np.int64)
+        self.job = np.array(job, dtype=np.uint8)
+        self.kind = np.array(kind, dtype=np.uint8)
+        self.current_hp = np.array(current_hp, dtype=np.float64)
+        self.cap_current_max = np.array(cap_current_max, dtype=np.float64)
+        self.card_id = np.array(card_id, dtype=np.int64)
+        self.squad_size = np.array(squad_size, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def of_kind(self, tag: str) -> np.ndarray:
+        """
+         Mask of entities with the given `APIEntitySpecific` tag, e.g. `"Squad"`.
+        """
+        return self.kind == KIND_CODES[tag]
+
+    def owned_by(self, player_ids: Sequence[int]) -> np.ndarray:
+        """
+         Mask of entities owned by any of the players, e.g. all players of a team.
+        """
+        return np.isin(self.player_entity_id, player_ids)
+
+    @staticmethod
+    def from_raw(entities: List[dict]) -> "EntityColumns":
+        """
+         Single pass over parsed JSON entities, without creating any pydantic objects.
+        """
+        ids, xs, ys, zs, owners, jobs, kinds, hps, hp_maxs, cards, sizes = [], [], [], [], [], [], [], [], [], [], []
+        for e in entities:
+            ids.append(e["id"])
+            position = e["position"]
+            xs.append(position["x"])
+            ys.append(position["y"])
+            zs.append(position["z"])
+            owner = e.get("player_entity_id")
+            owners.append(NO_PLAYER if owner is None else owner)
+            jobs.append(e["job"])
+            for tag, specific in e["specific"].items():
+                kinds.append(KIND_CODES[tag])
+                cards.append(specific.get("card_id", 0))
+                sizes.append(specific.get("squad_size", 0))
+            hp = hp_max = nan
+            for aspect in e["aspects"]:
+                health = aspect.get("Health")
+                if health is not None:
+                    hp = health["current_hp"]
+                    hp_max = health["cap_current_max"]
+                    break
+            hps.append(hp)
+            hp_maxs.append(hp_max)
+        return EntityColumns(ids, xs, ys, zs, owners, jobs, kinds, hps, hp_maxs, cards, sizes)
+
+    @staticmethod
+    def from_entities(entities: List[APIEntity]) -> "EntityColumns":
+        """
+         Single pass over decoded entities, lazy proxies (see `api.Lazy`) are read from their JSON.
+        """
+        if entities and isinstance(entities[0], LazyModel):
+            return EntityColumns.from_raw([e.raw for e in entities])
+        ids, xs, ys, zs, owners, jobs, kinds, hps, hp_maxs, cards, sizes = [], [], [], [], [], [], [], [], [], [], []
+        for e in entities:
+            ids.append(e.id)
+            position = e.position
+            xs.append(position.x)
+            ys.append(position.y)
+            zs.append(position.z)
+            owner = e.player_entity_id
+            owners.append(NO_PLAYER if owner is None else owner)
+            jobs.append(e.job)
+            specific = e.specific
+            kinds.append(_KIND_CODES_BY_CLASS[specific.__class__])
+            # `getattr` with default would go through the slow pydantic `__getattr__` for missing fields.
+            cards.append(specific.__dict__.get("card_id", 0))
+            sizes.append(specific.__dict__.get("squad_size", 0))
+            hp = hp_max = nan
+            for aspect in e.aspects:
+                if aspect.__class__ is AspectHealth:
+                    hp = aspect.current_hp
+                    hp_max = aspect.cap_current_max
+                    break
+            hps.append(hp)
+            hp_maxs.append(hp_max)
+        return EntityColumns(ids, xs, ys, zs, owners, jobs, kinds, hps, hp_maxs, cards, sizes)
+
+
+def _numeric_fields(cls: type) -> List[str]:
+    names = []
+    for name, field in cls.model_fields.items():
+        # `type` aliases, e.g. `ModeId`, are looked through.
+        annotation = getattr(field.annotation, "__value__", field.annotation)
+        if isinstance(annotation, type) and issubclass(annotation, (int, float)):
+            names.append(name)
+    return names
+
+
+def aspect_columns(entities: List[APIEntity], cls: type,
+                   fields: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """
+     Fields of the aspect `cls` of each entity, e.g. `aspect_columns(buildings, AspectHealth)["current_hp"]`,
+     as float arrays with `nan` for entities without it, and `"present"`, the mask of entities with it.
+     `fields` are all the numeric fields of `cls` by default. Lazy proxies (see `api.Lazy`) are read from their JSON.
+    """
+    names = list(_numeric_fields(cls) if fields is None else fields)
+    rows: List[int] = []
+    values: List[List[Any]] = []
+    if entities and isinstance(entities[0], LazyModel):
+        tag = AspectTags.tags[cls]
+        for i, e in enumerate(entities):
+            for aspect in e.raw["aspects"]:
+                found = aspect.get(tag)
+                if found is not None:
+                    rows.append(i)
+                    values.append([found[name] for name in names])
+                    break
+    else:
+        for i, e in enumerate(entities):
+            aspect = e.aspect(cls)
+            if aspect is not None:
+                rows.append(i)
+                found = aspect.__dict__
+                values.append([found[name] for name in names])
+    present = np.zeros(len(entities), dtype=bool)
+    present[rows] = True
+    columns = {name: np.full(len(entities), nan, dtype=np.float64) for name in names}
+    if rows:
+        table = np.array(values, dtype=np.float64).reshape(len(rows), len(names))
+        for j, name in enumerate(names):
+            columns[name][rows] = table[:, j]
+    columns["present"] = present
+    return columns
@@ -0,0 +1,162 @@
+"""
+ Fast encoding of commands to the JSON sent in `/tick` responses.
+ Encoders are compiled once per command type from its fields, and write the tagged JSON directly,
+ without going through the pydantic serializers.
+ Batch builders turn NumPy arrays into already encoded commands, without creating a model per command.
+"""
+import json
+from enum import IntEnum
+from math import isfinite
+from types import UnionType
+from typing import Annotated, Any, Callable, Dict, Iterable, List, Optional, Union, get_args, get_origin
+
+import numpy as np
+from pydantic import BaseModel, TypeAdapter
+
+from api.Types import APICommand, APICommandTags, ExternallyTagged, WalkMode
+
+Encoder = Callable[[Any], str]
+
+
+class CommandBatch:
+    """
+     Already encoded commands, can be returned from `BotImpl.tick` or passed to `BotImpl.emit`
+     along with the `APICommand`s.
+    """
+
+    def __init__(self, encoded: List[str]):
+        self.encoded = encoded
+        """
+         JSON of each command.
+        """
+
+    def __len__(self) -> int:
+        return len(self.encoded)
+
+
+def _float(value: float) -> str:
+    # Same as pydantic, JSON has no infinity or NaN.
+    return repr(float(value)) if isfinite(value) else "null"
+
+
+def _bool(value: bool) -> str:
+    return "true" if value else "false"
+
+
+def _int(value: int) -> str:
+    return str(int(value))
+
+
+def _list_encoder(item: Encoder) -> Encoder:
+    if item is _int:
+        return lambda value: "[" + ",".join([str(int(v)) for v in value]) + "]"
+    return lambda value: "[" + ",".join([item(v) for v in value]) + "]"
+
+
+def _optional_encoder(inner: Encoder) -> Encoder:
+    return lambda value: "null" if value is None else inner(value)
+
+
+def _tagged_encoder(tagged: ExternallyTagged) -> Encoder:
+    encoders = {cls: _model_encoder(cls, tag) for cls, tag in tagged.tags.items()}
+    return lambda value: encoders[value.__class__](value)
+
+
+def _model_encoder(cls: type, tag: Optional[str] = None) -> Encoder:
+    """
+     Object with the fields of `cls`, wrapped in `{tag: ...}` for variants of externally tagged unions.
+    """
+    head = "{" if tag is None else '{"' + tag + '":{'
+    tail = "}" if tag is None else "}}"
+    fields = []
+    for name, field in cls.model_fields.items():
+        annotation = Annotated[(field.annotation, *field.metadata)] if field.metadata else field.annotation
+        fields.append(('"' + name + '":', name, encoder_for(annotation)))
+
+    def encode(value: BaseModel) -> str:
+        values = value.__dict__
+        return head + ",".join([prefix + encoder(values[name]) for prefix, name, encoder in fields]) + tail
+
+    return encode
+
+
+_encoders: Dict[Any, Encoder] = {}
+
+
+def encoder_for(annotation: Any) -> Encoder:
+    """
+     Encoder for values of the given type annotation, computed once per annotation.
+     Types without a specialised encoder fall back to pydantic.
+    """
+    if annotation in _encoders:
+        return _encoders[annotation]
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Annotated:
+        tagged = next((a for a in annotation.__metadata__ if isinstance(a, ExternallyTagged)), None)
+        encoder = _tagged_encoder(tagged) if tagged is not None else encoder_for(args[0])
+    elif origin is list:
+        encoder = _list_encoder(encoder_for(args[0]))
+    elif (origin is Union or origin is UnionType) and len([a for a in args if a is not type(None)]) == 1:
+        encoder = _optional_encoder(encoder_for(next(a for a in args if a is not type(None))))
+    elif hasattr(annotation, "__value__"):
+        encoder = encoder_for(annotation.__value__)
+    elif annotation is bool:
+        encoder = _bool
+    elif annotation is int or isinstance(annotation, type) and issubclass(annotation, IntEnum):
+        encoder = _int
+    elif annotation is float:
+        encoder = _float
+    elif annotation is str:
+        encoder = json.dumps
+    elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        encoder = _model_encoder(annotation)
+    else:
+        adapter = TypeAdapter(annotation)
+        encoder = lambda value: adapter.dump_json(value).decode()
+    _encoders[annotation] = encoder
+    return encoder
+
+
+_encode_command = encoder_for(Annotated[APICommand, APICommandTags])
+
+
+def encode(commands: Iterable[Union[APICommand, CommandBatch]]) -> bytes:
+    """
+     JSON array of the commands, batches are spliced in place.
+    """
+    parts = []
+    for command in commands:
+        if command.__class__ is CommandBatch:
+            parts.extend(command.encoded)
+        else:
+            parts.append(_encode_command(command))
+    return ("[" + ",".join(parts) + "]").encode()
+
+
+def group_goto(squads: np.ndarray, x: np.ndarray, y: np.ndarray, walk_mode: WalkMode = WalkMode.Normal,
+               orientation: float = 0.0) -> CommandBatch:
+    """
+     One `APICommandGroupGoto` per squad, moving `squads[i]` to `(x[i], y[i])` (`Position2D` coordinates).
+    """
+    template = '{"GroupGoto":{"squads":[%d],"positions":[{"x":%s,"y":%s}],"walk_mode":%d,"orientation":%s}}'
+    tail = (int(walk_mode), _float(orientation))
+    return CommandBatch([template % ((squad, _float(x_i), _float(y_i)) + tail) for squad, x_i, y_i in zip(
+        np.asarray(squads, dtype=np.int64).tolist(),
+        np.asarray(x, dtype=np.float64).tolist(),
+        np.asarray(y, dtype=np.float64).tolist())])
+
+
+def group_attack(squads: np.ndarray, targets: np.ndarray, force_attack: bool = False) -> CommandBatch:
+    """
+     Squad `squads[i]` attacks entity `targets[i]`, one `APICommandGroupAttack` per distinct target.
+    """
+    squads = np.asarray(squads, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    order = np.argsort(targets, kind="stable")
+    distinct, starts = np.unique(targets[order], return_index=True)
+    groups = np.split(squads[order], starts[1:])
+    force = _bool(force_attack)
+    return CommandBatch(['{"GroupAttack":{"squads":[%s],"target_entity_id":%d,"force_attack":%s}}'
+                         % (",".join(map(str, group.tolist())), target, force)
+                         for group, target in zip(groups, distinct.tolist())])
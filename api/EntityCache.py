@@ -0,0 +1,68 @@
+"""
+ Decoded entities of the previous tick, reused for entities whose JSON did not change, so idle squads, buildings
+ and slots are not validated again every tick. Parsed JSON objects are compared as they are, which is a lot cheaper
+ than decoding them.
+"""
+from typing import Any, Callable, Dict, List, Sequence
+
+from api.Types import APIEntity, EntityId
+
+Decoder = Callable[[List[dict], Sequence[int]], List[APIEntity]]
+"""
+ Decodes the parsed JSON of entities, the second argument is the index of each in the tick, for error locations.
+"""
+
+
+def _copy(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_copy(v) for v in value]
+    return value
+
+
+class EntityCache:
+    """
+     One per match. Only the entities of the last tick are kept, so entities are evicted as soon as they disappear,
+     and at most `max_entities` of them.
+     The bot must not change the entities it gets, as they are handed out again in the next ticks.
+    """
+
+    def __init__(self, decode: Decoder, trusted: bool = False, max_entities: int = 50000):
+        self._decode = decode
+        self.trusted = trusted
+        """
+         `decode` turns the JSON into the entities in place, see `api.Trusted`, so it is given copies.
+        """
+        self.max_entities = max_entities
+        self.hits = 0
+        self.misses = 0
+        self._raw: Dict[EntityId, dict] = {}
+        self._decoded: Dict[EntityId, APIEntity] = {}
+
+    def decode(self, raw_entities: List[dict]) -> List[APIEntity]:
+        """
+         Entities of a tick, from their parsed JSON objects.
+        """
+        previous_raw = self._raw
+        previous = self._decoded
+        entities: List[Any] = [None] * len(raw_entities)
+        changed: List[int] = []
+        for i, raw in enumerate(raw_entities):
+            old = previous_raw.get(raw.get("id"))
+            if old is not None and old == raw:
+                entities[i] = previous[raw["id"]]
+            else:
+                changed.append(i)
+        # The cache keeps the JSON as it came.
+        batch = [_copy(raw_entities[i]) if self.trusted else raw_entities[i] for i in changed]
+        decoded = self._decode(batch, changed)
+        for i, entity in zip(changed, decoded):
+            entities[i] = entity
+        self.hits += len(entities) - len(changed)
+        self.misses += len(changed)
+
+        kept = raw_entities[:self.max_entities]
+        self._raw = {entity.id: raw for raw, entity in zip(kept, entities)}
+        self._decoded = {entity.id: entity for entity in entities[:self.max_entities]}
+        return entities
@@ -0,0 +1,88 @@
+"""
+ Lazy decoding of `/tick` bodies.
+ Entities and commands stay as parsed JSON, wrapped in proxies with the same attribute names as the models.
+ Each field is validated into its pydantic type on the first access, and then cached on the proxy.
+"""
+from typing import Annotated, Any, Callable, Dict, List, Optional, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+from api.Types import (APIEntity, APIGameState, AspectLookup, AspectTable, APIPlayerEntity, PlayerCommand,
+                       RejectedCommand)
+
+
+class LazyModel:
+    """
+     Proxy over parsed JSON object of `model`.
+    """
+    model: Type[BaseModel]
+    _decoders: Dict[str, Callable[[Any], Any]]
+    _defaults: Dict[str, Any]
+
+    def __init_subclass__(cls, model: Type[BaseModel], **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.model = model
+        cls._decoders = {}
+        cls._defaults = {}
+        for name, field in model.model_fields.items():
+            annotation = Annotated[(field.annotation, *field.metadata)] if field.metadata else field.annotation
+            cls._decoders[name] = TypeAdapter(annotation).validate_python
+            if not field.is_required():
+                cls._defaults[name] = field.default
+
+    def __init__(self, raw: dict):
+        self.raw = raw
+        """
+         Parsed JSON of the model.
+        """
+
+    def __getattr__(self, name: str) -> Any:
+        # Called only before the field is cached in the instance `__dict__`.
+        decoder = self._decoders.get(name)
+        if decoder is None:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        if name in self.raw:
+            value = decoder(self.raw[name])
+        else:
+            value = self._defaults[name]
+        self.__dict__[name] = value
+        return value
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.raw!r})"
+
+    def decode(self) -> BaseModel:
+        """
+         Fully decoded model.
+        """
+        return self.model.model_validate(self.raw)
+
+
+class LazyAPIEntity(LazyModel, AspectLookup, model=APIEntity):
+    _aspect_table: Optional[AspectTable] = None
+
+
+class LazyPlayerCommand(LazyModel, model=PlayerCommand):
+    pass
+
+
+class LazyRejectedCommand(LazyModel, model=RejectedCommand):
+    pass
+
+
+_players = TypeAdapter(List[APIPlayerEntity])
+
+
+def game_state(raw: dict) -> APIGameState:
+    """
+     `APIGameState` with `entities`, `commands` and `rejected_commands` made of lazy proxies.
+     `players` are validated right away.
+     It is not validated as a whole, so it can not be serialized by pydantic, use `decode()` of the proxies.
+    """
+    return APIGameState.model_construct(
+        current_tick=raw["current_tick"],
+        commands=[LazyPlayerCommand(c) for c in raw["commands"]],
+        rejected_commands=[LazyRejectedCommand(c) for c in raw["rejected_commands"]],
+        players=_players.validate_python(raw["players"]),
+        entities=[LazyAPIEntity(e) for e in raw["entities"]],
+    )
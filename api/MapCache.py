@@ -0,0 +1,142 @@
+"""
+ Results of per-map precomputation (distance fields, slot graphs, ...) kept on disk across matches,
+ so they are computed once per map version, and later matches only load them.
+ Official maps are keyed by `MapInfo.map`, community maps by their name and `CommunityMapInfo.crc`.
+"""
+import os
+import pickle
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+import numpy as np
+
+from api.Types import MapInfo
+
+T = TypeVar("T")
+
+_UNSAFE = re.compile(r"[^\w.-]+")
+_MISSING = object()
+"""
+ Not on disk, as opposed to a stored `None`.
+"""
+
+
+def map_key(map_info: MapInfo) -> str:
+    """
+     Changes with every new version of a community map.
+    """
+    details = map_info.community_map_details
+    if details is None:
+        return str(map_info.map)
+    return f"{map_info.map}-{_UNSAFE.sub('_', details.name)}-{details.crc:08x}"
+
+
+class MapCache:
+    """
+     Artifacts are pickled, except NumPy arrays, which are stored as `.npy` and loaded memory-mapped (read-only).
+     When the files take more than `max_bytes`, the least recently used ones are deleted.
+     In memory, only the `max_loaded` most recently used artifacts are kept, the others are loaded again from disk.
+     Without `directory` artifacts are only kept in memory.
+     Safe to use from several threads, and from several processes sharing the directory.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_bytes: int = 256 * 1024 * 1024, max_loaded: int = 32):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_loaded = max_loaded
+        self.hits = 0
+        self.misses = 0
+        self._loaded: "OrderedDict[str, Any]" = OrderedDict()
+        """
+         Artifacts this process already computed or loaded, by file name without extension, least recently used first.
+        """
+        self._lock = threading.Lock()
+        self._computing: Dict[str, threading.Lock] = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, map_info: MapInfo, name: str, compute: Callable[[], T]) -> T:
+        """
+         Artifact `name` of the map, `compute` is called only when it is not cached yet.
+         `name` has to change whenever `compute` does, e.g. `distances-v2`.
+        """
+        stem = f"{map_key(map_info)}-{_UNSAFE.sub('_', name)}"
+        with self._lock:
+            lock = self._computing.setdefault(stem, threading.Lock())
+        # Matches of the same map prepared at once compute it only once.
+        with lock:
+            with self._lock:
+                if stem in self._loaded:
+                    self._loaded.move_to_end(stem)
+                    self.hits += 1
+                    return self._loaded[stem]
+            value = self._load(stem)
+            if value is _MISSING:
+                self.misses += 1
+                value = compute()
+                self._store(stem, value)
+            else:
+                self.hits += 1
+            self._keep(stem, value)
+            return value
+
+    def _keep(self, stem: str, value: Any):
+        with self._lock:
+            self._loaded[stem] = value
+            while len(self._loaded) > self.max_loaded:
+                old, _ = self._loaded.popitem(last=False)
+                lock = self._computing.get(old)
+                if lock is not None and not lock.locked():
+                    del self._computing[old]
+
+    def _load(self, stem: str) -> Any:
+        if self.directory is None:
+            return _MISSING
+        path = os.path.join(self.directory, stem)
+        try:
+            if os.path.exists(path + ".npy"):
+                value = np.load(path + ".npy", mmap_mode="r")
+                os.utime(path + ".npy")
+                return value
+            with open(path + ".pkl", "rb") as file:
+                value = pickle.load(file)
+            os.utime(path + ".pkl")
+            return value
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError, ValueError):
+            # Evicted by another process meanwhile, or left incomplete.
+            return _MISSING
+
+    def _store(self, stem: str, value: Any):
+        if self.directory is None:
+            return
+        array = isinstance(value, np.ndarray) and value.dtype != object
+        path = os.path.join(self.directory, stem + (".npy" if array else ".pkl"))
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial, "wb") as file:
+            if array:
+                np.save(file, value)
+            else:
+                pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(partial, path)
+        self._evict()
+
+    def _evict(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith((".pkl", ".npy")):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,186 @@
+"""
+ Low overhead latency metrics of the bot server, rendered in Prometheus text format.
+ Observing a value is a bisect over fixed buckets, so it can stay on during real matches.
+"""
+from bisect import bisect_left
+from typing import Dict, List, Optional, Sequence, Tuple
+
+TIME_BUCKETS: Tuple[float, ...] = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.0075, 0.01, 0.015, 0.02, 0.03,
+                                   0.04, 0.05, 0.075, 0.09, 0.1, 0.25, 0.5, 1.0)
+"""
+ Upper bounds in seconds.
+"""
+COUNT_BUCKETS: Tuple[float, ...] = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 50000)
+
+TICK_INTERVAL = 0.1
+"""
+ Nominal time between two ticks in seconds.
+"""
+
+PHASES = ("read", "parse", "decode", "bot", "serialize")
+"""
+ Phases of `/start` and `/tick` requests, in order.
+"""
+
+
+def _labels(*labels: str) -> str:
+    joined = ",".join(label for label in labels if label)
+    return f"{{{joined}}}" if joined else ""
+
+
+class Histogram:
+    """
+     Counts of observations per fixed bucket, plus sum and max.
+    """
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        """
+         Last one is the `+Inf` bucket.
+        """
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "Histogram"):
+        """
+         Adds observations of `other` with the same bounds, e.g. from another process.
+        """
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """
+         Estimated by linear interpolation inside the bucket, that contains the quantile.
+        """
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if i == len(self.bounds):
+                    return self.max
+                lower = self.bounds[i - 1] if i else 0.0
+                upper = min(self.bounds[i], self.max)
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return self.max
+
+    def render(self, name: str, labels: str) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            le = f'le="{bound:g}"'
+            lines.append(f"{name}_bucket{_labels(labels, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{name}_bucket{_labels(labels, le)} {self.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {self.sum:.6f}")
+        lines.append(f"{name}_count{_labels(labels)} {self.count}")
+        return lines
+
+    def render_quantiles(self, name: str, labels: str) -> List[str]:
+        """
+         p50, p95, p99 and max (as quantile 1).
+        """
+        lines = []
+        for q, value in ((0.5, self.quantile(0.5)), (0.95, self.quantile(0.95)), (0.99, self.quantile(0.99)),
+                         (1, self.max)):
+            quantile = f'quantile="{q}"'
+            lines.append(f"{name}{_labels(labels, quantile)} {value:.6f}")
+        return lines
+
+
+class ServerMetrics:
+    """
+     Phase durations of `/start` and `/tick`, tick arrival jitter and entity counts.
+    """
+
+    def __init__(self):
+        self.phases: Dict[Tuple[str, str], Histogram] = {
+            (endpoint, phase): Histogram(TIME_BUCKETS) for endpoint in ("start", "tick") for phase in PHASES}
+        self.total: Dict[str, Histogram] = {endpoint: Histogram(TIME_BUCKETS) for endpoint in ("start", "tick")}
+        self.jitter = Histogram(TIME_BUCKETS)
+        """
+         Absolute difference of time between two ticks from `TICK_INTERVAL`.
+        """
+        self.entities = Histogram(COUNT_BUCKETS)
+        """
+         Entities per tick.
+        """
+        self._last_tick: Dict[str, float] = {}
+
+    def observe(self, endpoint: str, times: Sequence[float], entities: int, match: str = ""):
+        """
+         `times` are `perf_counter` values at the start of the request and after each of `PHASES`.
+         Jitter is measured between ticks of the same `match`.
+        """
+        for phase, start, end in zip(PHASES, times, times[1:]):
+            self.phases[(endpoint, phase)].observe(end - start)
+        self.total[endpoint].observe(times[-1] - times[0])
+        if endpoint == "tick":
+            self.entities.observe(entities)
+            last = self._last_tick.get(match)
+            if last is not None:
+                self.jitter.observe(abs(times[0] - last - TICK_INTERVAL))
+            self._last_tick[match] = times[0]
+        else:
+            self._last_tick.pop(match, None)
+
+    def finish(self, match: str = ""):
+        """
+         Forgets the last tick of a finished `match`.
+        """
+        self._last_tick.pop(match, None)
+
+    def merge(self, other: "ServerMetrics"):
+        for key, histogram in other.phases.items():
+            self.phases[key].merge(histogram)
+        for endpoint, histogram in other.total.items():
+            self.total[endpoint].merge(histogram)
+        self.jitter.merge(other.jitter)
+        self.entities.merge(other.entities)
+
+    def render(self, counters: Dict[str, int], gauges: Optional[Dict[str, float]] = None) -> str:
+        """
+         Prometheus text format, `counters` and `gauges` are added as they are.
+        """
+        lines = ["# TYPE skylords_request_phase_seconds histogram"]
+        for (endpoint, phase), histogram in self.phases.items():
+            lines += histogram.render("skylords_request_phase_seconds", f'endpoint="{endpoint}",phase="{phase}"')
+        lines.append("# TYPE skylords_request_phase_seconds_quantile gauge")
+        for (endpoint, phase), histogram in self.phases.items():
+            lines += histogram.render_quantiles("skylords_request_phase_seconds_quantile",
+                                                f'endpoint="{endpoint}",phase="{phase}"')
+        lines.append("# TYPE skylords_request_seconds histogram")
+        for endpoint, histogram in self.total.items():
+            lines += histogram.render("skylords_request_seconds", f'endpoint="{endpoint}"')
+        lines.append("# TYPE skylords_request_seconds_quantile gauge")
+        for endpoint, histogram in self.total.items():
+            lines += histogram.render_quantiles("skylords_request_seconds_quantile", f'endpoint="{endpoint}"')
+        lines.append("# TYPE skylords_tick_jitter_seconds histogram")
+        lines += self.jitter.render("skylords_tick_jitter_seconds", "")
+        lines.append("# TYPE skylords_tick_jitter_seconds_quantile gauge")
+        lines += self.jitter.render_quantiles("skylords_tick_jitter_seconds_quantile", "")
+        lines.append("# TYPE skylords_entities histogram")
+        lines += self.entities.render("skylords_entities", "")
+        lines.append("# TYPE skylords_entities_quantile gauge")
+        lines += self.entities.render_quantiles("skylords_entities_quantile", "")
+        for name, value in counters.items():
+            lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name} {value}")
+        for name, value in (gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
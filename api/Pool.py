@@ -0,0 +1,315 @@
+"""
+ Spreads matches over worker processes, so bots of concurrent matches do not share one core (and one GIL).
+ The front-end process only accepts HTTP: `/prepare`, `/start` and `/tick` bodies are passed as raw bytes
+ over a pipe to the worker the match is pinned to, which decodes them and runs the match's bot,
+ the same way `api.Wrapper` does in a single process. `/hello` is answered by the front-end.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import pickle
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, perf_counter
+from typing import Callable, Dict, Set, Tuple
+
+from fastapi import HTTPException
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+
+from api import Wrapper
+from api.Metrics import ServerMetrics
+from api.Types import APIPrepare
+
+logger = logging.getLogger(__name__)
+
+_REQUEST = struct.Struct(">I")
+"""
+ Request id, followed by `endpoint\nkey\nbody`.
+"""
+_REPLY = struct.Struct(">IH")
+"""
+ Request id and HTTP status, followed by the body.
+"""
+ENDPOINTS = ("prepare", "start", "tick")
+"""
+ Requests handled by the workers.
+"""
+
+
+def _serve(connection, index: int, affinity: bool, bot: "Wrapper.BotImpl", options: dict):
+    """
+     Worker process: answers requests from the front-end concurrently, each as soon as it is done.
+    """
+    if affinity and hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+    Wrapper.configure(bot, **options)
+    asyncio.run(_loop(connection))
+
+
+async def _loop(connection):
+    loop = asyncio.get_running_loop()
+    receiver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="receive")
+    tasks: Set[asyncio.Task] = set()
+    while True:
+        try:
+            # Waits on a thread, so the planners of `Wrapper.AsyncBotImpl` bots keep running between requests.
+            message = await loop.run_in_executor(receiver, connection.recv_bytes)
+        except EOFError:
+            break
+        (request_id,) = _REQUEST.unpack_from(message)
+        endpoint, key, body = message[_REQUEST.size:].split(b"\n", 2)
+        # A task per request, so e.g. a long `/prepare` does not hold up ticks of other matches.
+        task = loop.create_task(_reply(connection, request_id, endpoint.decode(), key.decode(), body))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    receiver.shutdown()
+    for task in list(tasks):
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for match in list(Wrapper._MATCHES.values()):
+        match.close()
+    if Wrapper._RECORDER is not None:
+        Wrapper._RECORDER.close()
+
+
+async def _reply(connection, request_id: int, endpoint: str, key: str, body: bytes):
+    try:
+        status, content = await _handle(endpoint, key, body)
+    except Exception:
+        logger.exception("%s of match %r failed", endpoint, key)
+        status, content = 500, b'{"detail":"Internal Server Error"}'
+    connection.send_bytes(_REPLY.pack(request_id, status) + content)
+
+
+async def _handle(endpoint: str, key: str, body: bytes) -> Tuple[int, bytes]:
+    times = [perf_counter()]
+    try:
+        if endpoint == "tick":
+            return 200, await Wrapper._tick(times, body, key)
+        if endpoint == "start":
+            return 200, await Wrapper._start(times, body, key)
+        if endpoint == "prepare":
+            await Wrapper._prepare(APIPrepare.model_validate_json(body), key)
+            return 200, b"null"
+        if endpoint == "metrics":
+            return 200, pickle.dumps((Wrapper._METRICS, Wrapper._counters(), len(Wrapper._MATCHES)))
+    except RequestValidationError as e:
+        return 422, json.dumps({"detail": e.errors()}, default=str).encode()
+    except ValidationError as e:
+        return 422, json.dumps({"detail": e.errors()}, default=str).encode()
+    except HTTPException as e:
+        return e.status_code, json.dumps({"detail": e.detail}).encode()
+    return 404, b'{"detail":"Not Found"}'
+
+
+class WorkerError(RuntimeError):
+    """
+     The worker process is gone, its requests are answered with 503.
+    """
+
+
+def _resolve(future: asyncio.Future, result: Tuple[int, bytes]):
+    if not future.done():
+        future.set_result(result)
+
+
+def _reject(future: asyncio.Future, error: Exception):
+    if not future.done():
+        future.set_exception(error)
+
+
+class Worker:
+    """
+     Front-end side of a worker process. Requests are written by a sender thread, so a large body
+     does not block the event loop while the worker is busy, and answers are read by a reader thread,
+     in any order, matched to the requests by id.
+    """
+
+    def __init__(self, index: int, affinity: bool, bot: "Wrapper.BotImpl", options: dict):
+        context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+        self.connection, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child, index, affinity, bot, options),
+                                       name=f"bot-worker-{index}", daemon=True)
+        self.process.start()
+        child.close()
+        self._sender = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"send-{index}")
+        self._ids = itertools.count()
+        self._pending: Dict[int, Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = {}
+        self._lock = threading.Lock()
+        self.alive = True
+        """
+         `False` once the pipe to the process is closed, e.g. the process died.
+        """
+        self._reader = threading.Thread(target=self._read, name=f"read-{index}", daemon=True)
+
+    def start(self):
+        """
+         Called once all the workers are forked, so no worker inherits running threads.
+        """
+        self._reader.start()
+
+    def _read(self):
+        while True:
+            try:
+                message = self.connection.recv_bytes()
+            except (EOFError, OSError):
+                break
+            request_id, status = _REPLY.unpack_from(message)
+            with self._lock:
+                pending = self._pending.pop(request_id, None)
+            if pending is not None:
+                loop, future = pending
+                loop.call_soon_threadsafe(_resolve, future, (status, message[_REPLY.size:]))
+        self._fail_all(WorkerError(f"{self.process.name} exited with {self.process.exitcode}"))
+
+    def _fail(self, request_id: int, error: Exception):
+        with self._lock:
+            pending = self._pending.pop(request_id, None)
+        if pending is not None:
+            loop, future = pending
+            loop.call_soon_threadsafe(_reject, future, error)
+
+    def _fail_all(self, error: Exception):
+        with self._lock:
+            self.alive = False
+            pending = self._pending
+            self._pending = {}
+        for loop, future in pending.values():
+            loop.call_soon_threadsafe(_reject, future, error)
+
+    async def request(self, endpoint: str, key: str, body: bytes) -> Tuple[int, bytes]:
+        """
+         Raises `WorkerError` when the worker process is gone, or goes away before answering.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if not self.alive:
+                raise WorkerError(f"{self.process.name} is not running")
+            request_id = next(self._ids) & 0xFFFFFFFF
+            self._pending[request_id] = (loop, future)
+        message = _REQUEST.pack(request_id) + f"{endpoint}\n{key}\n".encode() + body
+
+        def sent(done):
+            if done.exception() is not None:
+                self._fail(request_id, WorkerError(f"Sending to {self.process.name} failed: {done.exception()}"))
+
+        self._sender.submit(self.connection.send_bytes, message).add_done_callback(sent)
+        try:
+            return await future
+        finally:
+            # Still pending when the client went away.
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def close(self):
+        self._sender.shutdown(wait=True)
+        self.connection.close()
+        self.process.join(timeout=5.0)
+        self._fail_all(WorkerError(f"{self.process.name} was closed"))
+
+
+class PoolApp:
+    """
+     ASGI app of the front-end. A match is pinned to the worker with the fewest active matches on its
+     `/prepare` (or first request), so all requests of the match are served by the same bot instance.
+    """
+
+    def __init__(self, workers: int, affinity: bool, bot: "Wrapper.BotImpl", options: dict):
+        self.workers = [Worker(i, affinity, bot, options) for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+        self._assigned: Dict[str, Tuple[Worker, float]] = {}
+        """
+         Worker of each match key, and time of the last request.
+         Matches that timed out are dropped whenever a match is assigned.
+        """
+
+    def _worker(self, key: str, prepare: bool) -> Worker:
+        now = monotonic()
+        assigned = self._assigned.get(key)
+        if assigned is None or prepare or not assigned[0].alive:
+            alive = [worker for worker in self.workers if worker.alive] or self.workers
+            active = {id(worker): 0 for worker in self.workers}
+            for other, (worker, last) in list(self._assigned.items()):
+                if now - last >= Wrapper.MATCH_TIMEOUT_S:
+                    # Finished by the worker as well, see `Wrapper._replace`.
+                    del self._assigned[other]
+                elif other != key:
+                    active[id(worker)] += 1
+            worker = min(alive, key=lambda w: active[id(w)])
+        else:
+            worker = assigned[0]
+        self._assigned[key] = (worker, now)
+        return worker
+
+    async def _metrics(self) -> bytes:
+        metrics = ServerMetrics()
+        counters: Dict[str, int] = {}
+        matches = 0
+        for worker in self.workers:
+            try:
+                _, content = await worker.request("metrics", "", b"")
+            except WorkerError:
+                continue
+            worker_metrics, worker_counters, worker_matches = pickle.loads(content)
+            metrics.merge(worker_metrics)
+            for name, value in worker_counters.items():
+                counters[name] = counters.get(name, 0) + value
+            matches += worker_matches
+        return metrics.render(counters, {"skylords_matches": matches}).encode()
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        key, _, endpoint = scope["path"][1:].rpartition("/")
+        if scope["type"] == "http" and scope["method"] == "GET" and scope["path"] == "/metrics":
+            status, content, media = 200, await self._metrics(), b"text/plain; version=0.0.4"
+        elif scope["type"] == "http" and scope["method"] == "POST" and endpoint in ENDPOINTS and "/" not in key:
+            chunks = []
+            while True:
+                message = await receive()
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    break
+            worker = self._worker(key, endpoint == "prepare")
+            try:
+                status, content = await worker.request(endpoint, key, b"".join(chunks))
+            except WorkerError as e:
+                # The matches of the worker are lost with it, new ones are given to the other workers.
+                status, content = 503, json.dumps({"detail": str(e)}).encode()
+            media = b"application/json"
+        else:
+            await Wrapper.app(scope, receive, send)
+            return
+        await send({"type": "http.response.start", "status": status,
+                    "headers": [(b"content-type", media), (b"content-length", str(len(content)).encode())]})
+        await send({"type": "http.response.body", "body": content})
+
+    async def _lifespan(self, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+
+def pool_app(bot: "Wrapper.BotImpl", workers: int, affinity: bool = False, **options) -> PoolApp:
+    """
+     `options` are passed to `Wrapper.configure` in every worker.
+    """
+    return PoolApp(workers, affinity, bot, options)
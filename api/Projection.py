@@ -0,0 +1,118 @@
+"""
+ Parts of `/start` and `/tick` bodies a bot consumes, see `BotImpl.projection`.
+ Everything else is dropped from the parsed JSON before it is decoded, so entities of unused kinds, unused aspects
+ and effects cost only their parsing, not their validation and model construction.
+"""
+from typing import Any, FrozenSet, Iterable, List, Optional, Union
+
+from api.Types import APIEntitySpecificTags, AspectTags, ExternallyTagged
+
+_STATIC_KINDS = frozenset({"PowerSlot", "TokenSlot", "BarrierSet", "BarrierModule", "Building"})
+"""
+ Kinds `StaticMap` is built from.
+"""
+
+
+def _tags(names: Optional[Iterable[Union[str, type]]], tagged: ExternallyTagged) -> Optional[FrozenSet[str]]:
+    if names is None:
+        return None
+    tags = frozenset(tagged.tags.get(name, name.__name__) if isinstance(name, type) else name for name in names)
+    unknown = tags - tagged.variants.keys()
+    if unknown:
+        raise ValueError(f"Unknown tags {sorted(unknown)}, expected some of {sorted(tagged.variants)}")
+    return tags
+
+
+class Projection:
+    """
+     `kinds` are tags of `APIEntitySpecific` (e.g. `"Squad"`) or its classes, `aspects` tags of `Aspect`
+     (e.g. `"Health"`) or its classes, `None` keeps all of them. Entities of other kinds are left out of `entities`,
+     other aspects out of `aspects` of entities and players. Without `effects`, `commands` or `rejected_commands`
+     those lists are empty. Dropped parts are not validated either. The parsed JSON is changed in place.
+    """
+
+    def __init__(self, kinds: Optional[Iterable[Union[str, type]]] = None,
+                 aspects: Optional[Iterable[Union[str, type]]] = None,
+                 effects: bool = True, commands: bool = True, rejected_commands: bool = True):
+        self.kinds = _tags(kinds, APIEntitySpecificTags)
+        self.aspects = _tags(aspects, AspectTags)
+        self.effects = effects
+        self.commands = commands
+        self.rejected_commands = rejected_commands
+
+    def __repr__(self) -> str:
+        return (f"Projection(kinds={self.kinds}, aspects={self.aspects}, effects={self.effects}, "
+                f"commands={self.commands}, rejected_commands={self.rejected_commands})")
+
+    @property
+    def keeps_static_map(self) -> bool:
+        """
+         Whether the entities `StaticMap` is built from are kept.
+        """
+        return self.kinds is None or _STATIC_KINDS <= self.kinds
+
+    def entities(self, raw_entities: List[Any]) -> List[Any]:
+        """
+         Kept entities, in order.
+        """
+        kinds = self.kinds
+        prune = self.aspects is not None or not self.effects
+        if kinds is None and not prune:
+            return raw_entities
+        kept = []
+        for entity in raw_entities:
+            if type(entity) is dict:
+                if kinds is not None:
+                    # `None` for anything but a tagged object, which is left for the validation to report.
+                    tag = APIEntitySpecificTags.tag_of(entity.get("specific"))
+                    if tag is not None and tag not in kinds:
+                        continue
+                if prune:
+                    self._prune(entity)
+            kept.append(entity)
+        return kept
+
+    def start(self, raw: Any) -> Any:
+        """
+         Parsed `/start` body.
+        """
+        if type(raw) is not dict:
+            return raw
+        players = raw.get("players")
+        if type(players) is list:
+            for player in players:
+                if type(player) is dict and type(player.get("entity")) is dict:
+                    self._prune(player["entity"])
+        if type(raw.get("entities")) is list:
+            raw["entities"] = self.entities(raw["entities"])
+        return raw
+
+    def tick(self, raw: Any) -> Any:
+        """
+         Parsed `/tick` body.
+        """
+        if type(raw) is not dict:
+            return raw
+        if not self.commands and "commands" in raw:
+            raw["commands"] = []
+        if not self.rejected_commands and "rejected_commands" in raw:
+            raw["rejected_commands"] = []
+        players = raw.get("players")
+        if type(players) is list:
+            for player in players:
+                if type(player) is dict:
+                    self._prune(player)
+        if type(raw.get("entities")) is list:
+            raw["entities"] = self.entities(raw["entities"])
+        return raw
+
+    def _prune(self, entity: dict):
+        """
+         Drops effects and aspects of an entity or player.
+        """
+        if not self.effects and "effects" in entity:
+            entity["effects"] = []
+        aspects = self.aspects
+        if aspects is not None and type(entity.get("aspects")) is list:
+            entity["aspects"] = [aspect for aspect in entity["aspects"]
+                                 if (tag := AspectTags.tag_of(aspect)) is None or tag in aspects]
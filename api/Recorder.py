@@ -0,0 +1,286 @@
+"""
+ Records `/start` and `/tick` bodies of every match into a compact log, and reads them back.
+ A match is stored in two files:
+ - `<name>.rec`, frames of `kind (1 byte), length (4 bytes big endian), zlib compressed JSON`.
+   Kinds are `S` for the start state, `K` for a full tick (keyframe) and `D` for a tick stored as delta
+   against the previous one.
+ - `<name>.idx`, the keyframe interval on the first line, then one `block offset` line per keyframe.
+   Tick `t` is in block `t // keyframe_interval`, and each block starts with a keyframe,
+   so seeking to any tick reads at most `keyframe_interval` frames.
+"""
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct(">cI")
+_UNSET = "~"
+"""
+ Key of the delta of a dict, that lists keys missing in the new one.
+"""
+_MISSING = object()
+
+
+def _diff(old: dict, new: dict) -> dict:
+    """
+     Keys of `new`, that changed since `old`.
+    """
+    changed = {key: value for key, value in new.items() if old.get(key, _MISSING) != value}
+    unset = [key for key in old if key not in new]
+    if unset:
+        changed[_UNSET] = unset
+    return changed
+
+
+def _patch(old: dict, delta: dict) -> dict:
+    new = dict(old)
+    for key in delta.get(_UNSET, ()):
+        del new[key]
+    new.update((key, value) for key, value in delta.items() if key != _UNSET)
+    return new
+
+
+def delta(old: dict, new: dict) -> dict:
+    """
+     Tick `new` as changes since tick `old`: top-level fields that changed, and entities keyed by `EntityId`
+     with only their changed fields. Entities keep their order, unless it changed other than by appending.
+    """
+    old_entities: Dict[int, dict] = old["entities"]
+    new_entities: Dict[int, dict] = new["entities"]
+    changed = {}
+    added = []
+    for entity_id, entity in new_entities.items():
+        previous = old_entities.get(entity_id)
+        if previous is None:
+            added.append(entity)
+        elif previous != entity:
+            changed[str(entity_id)] = _diff(previous, entity)
+    removed = [entity_id for entity_id in old_entities if entity_id not in new_entities]
+    result = {
+        "fields": _diff({k: v for k, v in old.items() if k != "entities"},
+                        {k: v for k, v in new.items() if k != "entities"}),
+        "changed": changed,
+        "added": added,
+        "removed": removed,
+    }
+    gone = set(removed)
+    expected = [entity_id for entity_id in old_entities if entity_id not in gone]
+    expected += [entity["id"] for entity in added]
+    if expected != list(new_entities):
+        result["order"] = list(new_entities)
+    return result
+
+
+def apply(old: dict, change: dict) -> dict:
+    """
+     Inverse of `delta`.
+    """
+    new = _patch({k: v for k, v in old.items() if k != "entities"}, change["fields"])
+    entities = dict(old["entities"])
+    for entity_id in change["removed"]:
+        del entities[entity_id]
+    for entity_id, fields in change["changed"].items():
+        entity_id = int(entity_id)
+        entities[entity_id] = _patch(entities[entity_id], fields)
+    for entity in change["added"]:
+        entities[entity["id"]] = entity
+    if "order" in change:
+        entities = {entity_id: entities[entity_id] for entity_id in change["order"]}
+    new["entities"] = entities
+    return new
+
+
+def _keyed(state: dict) -> dict:
+    """
+     Tick with entities keyed by id, the form `delta` and `apply` work on.
+    """
+    keyed = dict(state)
+    keyed["entities"] = {entity["id"]: entity for entity in state["entities"]}
+    return keyed
+
+
+def _unkeyed(state: dict) -> dict:
+    unkeyed = dict(state)
+    unkeyed["entities"] = list(state["entities"].values())
+    return unkeyed
+
+
+class Recorder:
+    """
+     Bodies are only queued on the request path, parsing, diffing, compression and writing
+     happen on a background thread. Several matches can be recorded at once, each keyed by `match`.
+    """
+
+    def __init__(self, directory: str, keyframe_interval: int = 100, level: int = 6):
+        self.directory = directory
+        self.keyframe_interval = keyframe_interval
+        self.level = level
+        self._queue: "queue.Queue[Tuple[bytes, str, Optional[bytes]]]" = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="recorder", daemon=True)
+        self._thread.start()
+
+    def start(self, body: bytes, match: str = ""):
+        """
+         Starts a new log of `match`.
+        """
+        self._queue.put((b"S", match, body))
+
+    def tick(self, body: bytes, match: str = ""):
+        self._queue.put((b"T", match, body))
+
+    def finish(self, match: str = ""):
+        """
+         Closes the log of `match`.
+        """
+        self._queue.put((b"F", match, b""))
+
+    def close(self):
+        self._queue.put((b"", "", None))
+        self._thread.join()
+
+    def _run(self):
+        writers: Dict[str, _MatchWriter] = {}
+        while True:
+            kind, match, body = self._queue.get()
+            if body is None:
+                break
+            try:
+                if kind == b"T":
+                    writer = writers.get(match)
+                    if writer is not None:
+                        writer.tick(json.loads(body))
+                    continue
+                writer = writers.pop(match, None)
+                if writer is not None:
+                    writer.close()
+                if kind == b"S":
+                    writers[match] = _MatchWriter(self, match, json.loads(body))
+            except Exception:
+                logger.exception("Recording failed")
+        for writer in writers.values():
+            writer.close()
+
+
+class _MatchWriter:
+    def __init__(self, recorder: Recorder, match: str, start: dict):
+        self.keyframe_interval = recorder.keyframe_interval
+        self.level = recorder.level
+        os.makedirs(recorder.directory, exist_ok=True)
+        parts = [time.strftime('%Y%m%d-%H%M%S'), match, str(start['your_player_id'])]
+        name = os.path.join(recorder.directory, "-".join(part for part in parts if part))
+        if os.path.exists(name + ".rec"):
+            # Same match started again within a second.
+            name += f"-{next(i for i in range(1, 1000) if not os.path.exists(f'{name}-{i}.rec'))}"
+        self.path = name + ".rec"
+        self._file = open(self.path, "wb")
+        self._index = open(name + ".idx", "w")
+        self._index.write(f"{self.keyframe_interval}\n")
+        self._previous: Optional[dict] = None
+        self._write(b"S", start)
+
+    def _write(self, kind: bytes, value: dict):
+        data = zlib.compress(json.dumps(value, separators=(",", ":")).encode(), self.level)
+        self._file.write(_HEADER.pack(kind, len(data)))
+        self._file.write(data)
+        self._file.flush()
+
+    def tick(self, state: dict):
+        keyed = _keyed(state)
+        block = state["current_tick"] // self.keyframe_interval
+        previous = self._previous
+        if previous is None or previous["current_tick"] // self.keyframe_interval != block:
+            self._index.write(f"{block} {self._file.tell()}\n")
+            self._index.flush()
+            self._write(b"K", state)
+        else:
+            self._write(b"D", delta(previous, keyed))
+        self._previous = keyed
+
+    def close(self):
+        self._file.close()
+        self._index.close()
+
+
+def _read(file) -> Optional[Tuple[bytes, dict]]:
+    header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        return None
+    kind, length = _HEADER.unpack(header)
+    data = file.read(length)
+    if len(data) < length:
+        # Last frame of a match, that is still being recorded.
+        return None
+    return kind, json.loads(zlib.decompress(data))
+
+
+class Recording:
+    """
+     One recorded match, ticks are returned as parsed JSON, the same as the bodies received.
+    """
+
+    def __init__(self, path: str):
+        """
+         `path` of the `.rec` file, with or without the extension.
+        """
+        base = path[:-4] if path.endswith(".rec") else path
+        self.path = base + ".rec"
+        self.index: Dict[int, int] = {}
+        """
+         Offset of the keyframe starting each block of ticks.
+        """
+        with open(base + ".idx") as index:
+            self.keyframe_interval = int(index.readline())
+            for line in index:
+                block, offset = line.split()
+                self.index[int(block)] = int(offset)
+        with open(self.path, "rb") as file:
+            _, self.start = _read(file)
+
+    def _frames(self, offset: int) -> Iterator[Tuple[bytes, dict]]:
+        with open(self.path, "rb") as file:
+            file.seek(offset)
+            while (frame := _read(file)) is not None:
+                yield frame
+
+    def _states(self, offset: int) -> Iterator[dict]:
+        """
+         Ticks from the keyframe at `offset`, with entities keyed by id.
+        """
+        state = None
+        for kind, value in self._frames(offset):
+            state = _keyed(value) if kind == b"K" else apply(state, value)
+            yield state
+
+    def ticks(self) -> Iterator[dict]:
+        """
+         All ticks in order.
+        """
+        if self.index:
+            for state in self._states(min(self.index.values())):
+                yield _unkeyed(state)
+
+    def seek(self, tick: int) -> Optional[dict]:
+        """
+         Last recorded tick not after `tick`, `None` when there is none.
+        """
+        blocks = [block for block in self.index if block <= tick // self.keyframe_interval]
+        while blocks:
+            # Either no tick was recorded in the block of `tick`, or its first one comes after `tick`,
+            # then the answer is the last tick of the block before it.
+            block = max(blocks)
+            blocks.remove(block)
+            found = None
+            for state in self._states(self.index[block]):
+                if state["current_tick"] > tick:
+                    break
+                found = state
+            if found is not None:
+                return _unkeyed(found)
+        return None
@@ -0,0 +1,123 @@
+"""
+ Runs a bot against a recorded match in-process, without HTTP, and reports how long each tick took.
+ A recording is either a log written by `api.Recorder`, or a directory with one raw JSON body per request,
+ read in the order of file names (numbers in names are compared as numbers).
+"""
+import asyncio
+import json
+import os
+import re
+from time import perf_counter
+from typing import Iterator, List, NamedTuple, Tuple
+
+import numpy as np
+
+from api import Commands, Wrapper
+from api.Recorder import Recording
+
+PHASES = ("parse", "decode", "bot", "encode")
+
+
+class TickTiming(NamedTuple):
+    current_tick: int
+    entities: int
+    phases: Tuple[float, ...]
+    """
+     Milliseconds of each of `PHASES`.
+    """
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases)
+
+
+def _natural(name: str) -> List:
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def bodies(path: str) -> Tuple[bytes, Iterator[bytes]]:
+    """
+     Body of `/start` and of all the `/tick`s of the recording.
+    """
+    if os.path.isdir(path):
+        names = sorted((name for name in os.listdir(path) if name.endswith(".json")), key=_natural)
+        contents = []
+        for name in names:
+            with open(os.path.join(path, name), "rb") as file:
+                contents.append(file.read())
+        starts = [i for i, body in enumerate(contents) if b'"your_player_id"' in body]
+        if not starts:
+            raise ValueError(f"No /start body in {path}")
+        start = starts[-1]
+        return contents[start], iter(contents[start + 1:])
+    recording = Recording(path)
+    return json.dumps(recording.start).encode(), (json.dumps(tick).encode() for tick in recording.ticks())
+
+
+class ReplayReport:
+    def __init__(self, start_ms: float, ticks: List[TickTiming], deadline_ms: float):
+        self.start_ms = start_ms
+        self.ticks = ticks
+        self.deadline_ms = deadline_ms
+
+    @property
+    def over_deadline(self) -> int:
+        return sum(1 for tick in self.ticks if tick.total > self.deadline_ms)
+
+    def render(self, slowest: int = 10) -> str:
+        lines = [f"match_start {self.start_ms:.2f} ms, {len(self.ticks)} ticks"]
+        if not self.ticks:
+            return lines[0]
+        phases = np.array([tick.phases for tick in self.ticks])
+        columns = list(PHASES) + ["total"]
+        values = np.column_stack([phases, phases.sum(axis=1)])
+        lines.append(f"{'ms':>6}" + "".join(f"{name:>10}" for name in columns))
+        for label, q in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100)):
+            lines.append(f"{label:>6}" + "".join(f"{v:>10.2f}" for v in np.percentile(values, q, axis=0)))
+        lines.append(f"{self.over_deadline} ticks over {self.deadline_ms:g} ms")
+        lines.append(f"slowest ticks:\n{'tick':>8} {'entities':>9} {'total ms':>9}")
+        for tick in sorted(self.ticks, key=lambda t: t.total, reverse=True)[:slowest]:
+            lines.append(f"{tick.current_tick:>8} {tick.entities:>9} {tick.total:>9.2f}")
+        return "\n".join(lines)
+
+
+def replay(bot: Wrapper.BotImpl, path: str, trusted: bool = False, lazy: bool = False,
+           deadline_ms: float = 50.0, reuse_entities: bool = False) -> ReplayReport:
+    """
+     Feeds the recording to `bot` the same way the server does, as fast as possible.
+     `trusted`, `lazy` and `reuse_entities` are the same as in `Wrapper.run`.
+     The planner of a `Wrapper.AsyncBotImpl` only runs while its ticks await, as there is no time between ticks.
+    """
+    Wrapper.configure(bot, trusted=trusted, lazy=lazy, reuse_entities=reuse_entities)
+    return asyncio.run(_replay(bot, path, deadline_ms))
+
+
+async def _replay(bot: Wrapper.BotImpl, path: str, deadline_ms: float) -> ReplayReport:
+    match = Wrapper.Match("", bot)
+    asynchronous = isinstance(bot, Wrapper.AsyncBotImpl)
+    start_body, tick_bodies = bodies(path)
+    began = perf_counter()
+    Wrapper._bot_match_start(bot, Wrapper._decode_start(match, json.loads(start_body)))
+    if asynchronous:
+        bot._start_planner()
+    start_ms = (perf_counter() - began) * 1000.0
+    ticks = []
+    for body in tick_bodies:
+        times = [perf_counter()]
+        raw = json.loads(body)
+        times.append(perf_counter())
+        entities = len(raw["entities"])
+        state = Wrapper._decode_tick(match, raw)
+        times.append(perf_counter())
+        if asynchronous:
+            commands = await Wrapper._bot_tick_async(bot, state, [])
+        else:
+            commands = Wrapper._bot_tick(bot, state, [])
+        times.append(perf_counter())
+        Commands.encode(commands)
+        times.append(perf_counter())
+        ticks.append(TickTiming(state.current_tick, entities,
+                                tuple((end - start) * 1000.0 for start, end in zip(times, times[1:]))))
+    if asynchronous:
+        bot._stop_planner()
+    return ReplayReport(start_ms, ticks, deadline_ms)
@@ -0,0 +1,119 @@
+"""
+ Uniform grid over the 2D projection of entity positions (`x`, `z`, same as `PositionExtension.to2d`).
+ Query points are given as `(x, y)` pairs of `Position2D` coordinates.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from api.Columns import EntityColumns
+
+
+class SpatialIndex:
+    """
+     Rows are sorted by grid cell, so each row of cells of a query square is a contiguous slice.
+     Results are row indices into the arrays the index was built from (e.g. `EntityColumns`).
+    """
+
+    def __init__(self, x: np.ndarray, z: np.ndarray, cell_size: float = 32.0, max_cells: int = 1 << 16):
+        x = np.asarray(x, dtype=np.float64)
+        z = np.asarray(z, dtype=np.float64)
+        self.size = len(x)
+        self.origin_x = float(x.min()) if self.size else 0.0
+        self.origin_z = float(z.min()) if self.size else 0.0
+        extent = max(float(x.max()) - self.origin_x, float(z.max()) - self.origin_z, 1.0) if self.size else 1.0
+        # Huge maps with tiny cells would spend more time on empty cells than on entities.
+        self.cell_size = max(cell_size, extent / np.sqrt(max_cells))
+        self.width = int(extent // self.cell_size) + 1
+        cx = ((x - self.origin_x) // self.cell_size).astype(np.int64)
+        cz = ((z - self.origin_z) // self.cell_size).astype(np.int64)
+        cells = cz * self.width + cx
+        order = np.argsort(cells, kind="stable")
+        self.rows = order
+        """
+         Row of each sorted position.
+        """
+        self.x = x[order]
+        self.z = z[order]
+        self.starts = np.searchsorted(cells[order], np.arange(self.width * self.width + 1))
+        """
+         `starts[c]:starts[c + 1]` is the slice of sorted positions in cell `c`.
+        """
+
+    @staticmethod
+    def from_columns(columns: EntityColumns, cell_size: float = 32.0) -> "SpatialIndex":
+        return SpatialIndex(columns.x, columns.z, cell_size)
+
+    def _covers_all(self, px: float, pz: float, reach: int) -> bool:
+        cx = (px - self.origin_x) // self.cell_size
+        cz = (pz - self.origin_z) // self.cell_size
+        return cx - reach <= 0 and cz - reach <= 0 and cx + reach >= self.width - 1 and cz + reach >= self.width - 1
+
+    def _candidates(self, px: float, pz: float, reach: int) -> np.ndarray:
+        """
+         Sorted positions in the square of `reach` cells around the point.
+        """
+        cx = int((px - self.origin_x) // self.cell_size)
+        cz = int((pz - self.origin_z) // self.cell_size)
+        x0 = min(max(cx - reach, 0), self.width - 1)
+        x1 = min(max(cx + reach, 0), self.width - 1)
+        z0 = max(cz - reach, 0)
+        z1 = min(cz + reach, self.width - 1)
+        if cx + reach < 0 or cx - reach >= self.width or z0 > z1:
+            return np.empty(0, dtype=np.int64)
+        starts = self.starts
+        slices = [np.arange(starts[row + x0], starts[row + x1 + 1])
+                  for row in range(z0 * self.width, z1 * self.width + 1, self.width)]
+        return np.concatenate(slices)
+
+    def within(self, points: np.ndarray, radius: float, mask: Optional[np.ndarray] = None) -> List[np.ndarray]:
+        """
+         For each of `points` (shape `(n, 2)`) the rows within `radius`.
+         `mask` (bool per row) filters the rows, e.g. `columns.owned_by(opponents)`.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        reach = int(np.ceil(radius / self.cell_size))
+        r2 = radius * radius
+        result = []
+        for px, pz in points:
+            candidates = self._candidates(px, pz, reach)
+            dx = self.x[candidates] - px
+            dz = self.z[candidates] - pz
+            rows = self.rows[candidates[dx * dx + dz * dz <= r2]]
+            if mask is not None:
+                rows = rows[mask[rows]]
+            result.append(rows)
+        return result
+
+    def nearest(self, points: np.ndarray, k: int = 1,
+                mask: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+         For each of `points` (shape `(n, 2)`) the `k` nearest rows and their distances, both shape `(n, k)`.
+         Sorted from the nearest, padded with row `-1` and distance `inf` when there are not enough rows.
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        rows = np.full((len(points), k), -1, dtype=np.int64)
+        distances = np.full((len(points), k), np.inf)
+        available = self.size if mask is None else int(np.count_nonzero(mask))
+        for i, (px, pz) in enumerate(points):
+            reach = 1
+            while True:
+                candidates = self._candidates(px, pz, reach)
+                if mask is not None:
+                    candidates = candidates[mask[self.rows[candidates]]]
+                dx = self.x[candidates] - px
+                dz = self.z[candidates] - pz
+                d = np.sqrt(dx * dx + dz * dz)
+                if len(d) > k:
+                    best = np.argpartition(d, k - 1)[:k]
+                else:
+                    best = np.arange(len(d))
+                best = best[np.argsort(d[best])]
+                # Whole circle of the k-th distance must be inside the searched square.
+                complete = len(d) >= min(k, available) and (len(best) == 0 or d[best[-1]] <= reach * self.cell_size)
+                if complete or self._covers_all(px, pz, reach):
+                    break
+                reach *= 2
+            rows[i, :len(best)] = self.rows[candidates[best]]
+            distances[i, :len(best)] = d[best]
+        return rows, distances
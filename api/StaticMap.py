@@ -0,0 +1,195 @@
+"""
+ Entities, that stay on the map for the whole match: power slots, token slots, barriers and neutral buildings.
+ They are sorted out once from `/start` into arrays, with the distances between slots and player starts precomputed,
+ every tick only writes their owner and the few fields that change, e.g. `PowerSlot.state`.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from api.Columns import NO_PLAYER
+from api.Lazy import LazyModel
+from api.Types import APIEntity, APIEntitySpecificTags, APIGameStartState, APIGameState, EntityId
+
+DYNAMIC_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "PowerSlot": ("state", "team"),
+    "TokenSlot": ("color",),
+    "BarrierSet": (),
+    "BarrierModule": ("team", "state", "free_slots", "walkable"),
+    "Building": (),
+}
+"""
+ Fields of `APIEntitySpecific` updated every tick, by tag.
+"""
+STATIC_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "BarrierModule": ("set", "slots"),
+    "Building": ("card_id",),
+}
+"""
+ Fields of `APIEntitySpecific` read only on `/start`, by tag.
+"""
+
+
+class StaticEntities:
+    """
+     Entities of one kind, row `i` of every array describes the same entity.
+     Fields of `APIEntitySpecific` are looked up by name, e.g. `static_map.power_slots["state"]`.
+    """
+
+    def __init__(self, tag: str, entities: List[Tuple[EntityId, float, float, int, dict]]):
+        self.tag = tag
+        self.id = np.array([e[0] for e in entities], dtype=np.int64)
+        self.xy = np.array([(e[1], e[2]) for e in entities], dtype=np.float64).reshape(-1, 2)
+        """
+         `x` and `z` of the position.
+        """
+        self.owner = np.array([e[3] for e in entities], dtype=np.int64)
+        """
+         `NO_PLAYER` when not owned.
+        """
+        self.present = np.ones(len(entities), dtype=bool)
+        """
+         `False` while the entity is missing from the ticks, e.g. a destroyed barrier module.
+        """
+        self.dynamic = DYNAMIC_FIELDS[tag]
+        self.fields: Dict[str, np.ndarray] = {
+            name: np.array([e[4][name] for e in entities], dtype=np.int64)
+            for name in self.dynamic + STATIC_FIELDS.get(tag, ())
+        }
+        self.row: Dict[EntityId, int] = {entity_id: i for i, entity_id in enumerate(self.id.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        return self.fields[field]
+
+    def owned_by(self, player_ids) -> np.ndarray:
+        """
+         Mask of the entities owned by any of the players, and still present.
+        """
+        return np.isin(self.owner, player_ids) & self.present
+
+
+def _fields(entity: APIEntity) -> Tuple[EntityId, str, Optional[EntityId], dict, dict]:
+    """
+     Id, `APIEntitySpecific` tag, owner, specific fields and position, of decoded or lazy (see `api.Lazy`) entities.
+    """
+    if isinstance(entity, LazyModel):
+        raw = entity.raw
+        ((tag, specific),) = raw["specific"].items()
+        return raw["id"], tag, raw.get("player_entity_id"), specific, raw["position"]
+    specific = entity.specific
+    position = entity.position
+    return (entity.id, APIEntitySpecificTags.tags[specific.__class__], entity.player_entity_id, specific.__dict__,
+            {"x": position.x, "z": position.z})
+
+
+class StaticMap:
+    """
+     Fed by the wrapper from `/start` and every `/tick`, see `BotImpl.keep_map`.
+    """
+
+    def __init__(self):
+        empty: List[Tuple[EntityId, float, float, int, dict]] = []
+        self.power_slots = StaticEntities("PowerSlot", empty)
+        self.token_slots = StaticEntities("TokenSlot", empty)
+        self.barrier_sets = StaticEntities("BarrierSet", empty)
+        self.barrier_modules = StaticEntities("BarrierModule", empty)
+        self.neutral_buildings = StaticEntities("Building", empty)
+        """
+         Buildings without owner on `/start`.
+        """
+        self.player_ids = np.zeros(0, dtype=np.int64)
+        self.start_xy = np.zeros((0, 2), dtype=np.float64)
+        """
+         Start of each of `player_ids`: its token slot on `/start`, or the middle of its entities without one.
+        """
+        self.slot_ids = np.zeros(0, dtype=np.int64)
+        """
+         Power slots followed by token slots.
+        """
+        self.slot_distances = np.zeros((0, 0), dtype=np.float32)
+        """
+         Distance between each two of `slot_ids`.
+        """
+        self.start_distances = np.zeros((0, 0), dtype=np.float32)
+        """
+         Distance of each of `slot_ids` (rows) to the start of each of `player_ids` (columns).
+        """
+        self._lookup: Dict[EntityId, Tuple[StaticEntities, int]] = {}
+
+    @property
+    def groups(self) -> Tuple[StaticEntities, ...]:
+        return self.power_slots, self.token_slots, self.barrier_sets, self.barrier_modules, self.neutral_buildings
+
+    def start(self, start: APIGameStartState):
+        found: Dict[str, List[Tuple[EntityId, float, float, int, dict]]] = {tag: [] for tag in DYNAMIC_FIELDS}
+        owned: Dict[EntityId, List[Tuple[float, float]]] = {}
+        for entity in start.entities:
+            entity_id, tag, owner, specific, position = _fields(entity)
+            if owner is not None:
+                owned.setdefault(owner, []).append((position["x"], position["z"]))
+            if tag in found and (tag != "Building" or owner is None):
+                found[tag].append((entity_id, position["x"], position["z"],
+                                   NO_PLAYER if owner is None else owner, specific))
+        self.power_slots = StaticEntities("PowerSlot", found["PowerSlot"])
+        self.token_slots = StaticEntities("TokenSlot", found["TokenSlot"])
+        self.barrier_sets = StaticEntities("BarrierSet", found["BarrierSet"])
+        self.barrier_modules = StaticEntities("BarrierModule", found["BarrierModule"])
+        self.neutral_buildings = StaticEntities("Building", found["Building"])
+        self._lookup = {entity_id: (group, row) for group in self.groups for entity_id, row in group.row.items()}
+
+        self.player_ids = np.array([player.entity.id for player in start.players], dtype=np.int64)
+        starts = []
+        for player_id in self.player_ids.tolist():
+            token_slots = self.token_slots.xy[self.token_slots.owner == player_id]
+            if len(token_slots):
+                starts.append(token_slots[0])
+            elif player_id in owned:
+                starts.append(np.mean(owned[player_id], axis=0))
+            else:
+                starts.append((np.nan, np.nan))
+        self.start_xy = np.array(starts, dtype=np.float64).reshape(-1, 2)
+
+        self.slot_ids = np.concatenate([self.power_slots.id, self.token_slots.id])
+        slot_xy = np.concatenate([self.power_slots.xy, self.token_slots.xy])
+        self.slot_distances = np.linalg.norm(slot_xy[:, None] - slot_xy[None], axis=2).astype(np.float32)
+        self.start_distances = np.linalg.norm(slot_xy[:, None] - self.start_xy[None], axis=2).astype(np.float32)
+
+    def update(self, state: APIGameState):
+        """
+         One dictionary lookup per entity of the tick, the rest of the entities are left alone.
+        """
+        lookup = self._lookup
+        if not lookup:
+            return
+        for group in self.groups:
+            group.present[:] = False
+        entities = state.entities
+        if entities and isinstance(entities[0], LazyModel):
+            for entity in entities:
+                raw = entity.raw
+                hit = lookup.get(raw["id"])
+                if hit is not None:
+                    (specific,) = raw["specific"].values()
+                    self._set(hit, raw.get("player_entity_id"), specific)
+        else:
+            for entity in entities:
+                hit = lookup.get(entity.id)
+                if hit is not None:
+                    self._set(hit, entity.player_entity_id, entity.specific.__dict__)
+
+    @staticmethod
+    def _set(hit: Tuple[StaticEntities, int], owner: Optional[EntityId], specific: dict):
+        group, row = hit
+        group.present[row] = True
+        group.owner[row] = NO_PLAYER if owner is None else owner
+        for name in group.dynamic:
+            group.fields[name][row] = specific[name]
+
+    def start_of(self, player_id: EntityId) -> np.ndarray:
+        """
+         `x` and `z` of the start of the player.
+        """
+        return self.start_xy[np.flatnonzero(self.player_ids == player_id)[0]]
@@ -0,0 +1,223 @@
+"""
+ Incremental parser of `/start` and `/tick` bodies, fed with the chunks of the request as they are received.
+ Every object of the top level `entities` array is parsed as soon as its last byte arrives, and handed out
+ by the `feed` of that chunk, so parsing and decoding overlap with receiving, and the JSON of only one chunk
+ of entities is held at a time instead of the whole tree. The other fields are small, they are returned at the end.
+"""
+import codecs
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+_skip_whitespace = re.compile(r"[ \t\n\r]*").match
+
+
+class StreamError(ValueError):
+    pass
+
+
+class EntityStream:
+    def __init__(self):
+        self.fields: Dict[str, Any] = {}
+        """
+         Fields of the body other than `entities`.
+        """
+        self._ready: List[dict] = []
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key: Optional[str] = None
+        self._closed = False
+
+    def feed(self, chunk: bytes) -> List[dict]:
+        """
+         Parsed JSON objects of the entities completed by `chunk`.
+        """
+        self._buffer = self._buffer[self._pos:] + self._decode(chunk)
+        self._pos = 0
+        self._parse()
+        return self._take()
+
+    def close(self) -> List[dict]:
+        """
+         Parsed JSON objects of the last entities, once the whole body was fed.
+        """
+        self._buffer = self._buffer[self._pos:] + self._decode(b"", final=True)
+        self._pos = 0
+        self._closed = True
+        self._parse()
+        if self._state != "end" or self._buffer[self._pos:].strip(_WHITESPACE):
+            raise StreamError(f"Incomplete or invalid JSON body at {self._state}")
+        return self._take()
+
+    def _decode(self, chunk: bytes, final: bool = False) -> str:
+        try:
+            return self._text.decode(chunk, final)
+        except UnicodeDecodeError as e:
+            raise StreamError(str(e)) from e
+
+    def _take(self) -> List[dict]:
+        entities = self._ready
+        self._ready = []
+        return entities
+
+    def _skip(self) -> Optional[str]:
+        """
+         Next character that is not whitespace, `None` when more data is needed.
+        """
+        buffer = self._buffer
+        pos = self._pos
+        while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return buffer[pos] if pos < len(buffer) else None
+
+    def _value(self) -> tuple:
+        """
+         `(True, value)` of the JSON value at the position, `(False, None)` when it is not complete yet.
+        """
+        try:
+            value, end = _decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError as e:
+            if self._closed:
+                raise StreamError(str(e)) from e
+            return False, None
+        # A number at the very end of the data received so far can still continue in the next chunk.
+        if end == len(self._buffer) and not self._closed:
+            return False, None
+        self._pos = end
+        return True, value
+
+    def _expect(self, char: str) -> bool:
+        found = self._skip()
+        if found is None:
+            return False
+        if found != char:
+            raise StreamError(f"Expected {char!r} at {self._state}, found {found!r}")
+        self._pos += 1
+        return True
+
+    def _entities(self) -> bool:
+        """
+         Goes through the `entities` array up to its end, `False` when more data is needed first.
+         Most of the body is in there, so it does not go through the state machine for every entity.
+        """
+        buffer = self._buffer
+        size = len(buffer)
+        pos = self._pos
+        closed = self._closed
+        append = self._ready.append
+        # `]` only closes an empty array here, after a `,` an entity has to follow.
+        first = self._state == "entity_first"
+        while True:
+            pos = _skip_whitespace(buffer, pos).end()
+            if pos == size:
+                self._pos = pos
+                self._state = "entity_first" if first else "entity"
+                return False
+            if buffer[pos] == "]":
+                if not first:
+                    raise StreamError("Expected an entity after ',' in entities, found ']'")
+                self._pos = pos + 1
+                self._state = "next"
+                return True
+            try:
+                entity, end = _decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                if closed:
+                    raise StreamError(str(e)) from e
+                self._pos = pos
+                self._state = "entity_first" if first else "entity"
+                return False
+            if end == size and not closed:
+                self._pos = pos
+                self._state = "entity_first" if first else "entity"
+                return False
+            append(entity)
+            pos = _skip_whitespace(buffer, end).end()
+            if pos == size:
+                self._pos = pos
+                self._state = "entity_next"
+                return False
+            if buffer[pos] == ",":
+                pos += 1
+                first = False
+            elif buffer[pos] == "]":
+                self._pos = pos + 1
+                self._state = "next"
+                return True
+            else:
+                raise StreamError(f"Expected ',' or ']' in entities, found {buffer[pos]!r}")
+
+    def _parse(self):
+        while True:
+            state = self._state
+            if state == "start":
+                if not self._expect("{"):
+                    return
+                self._state = "key"
+            elif state == "key":
+                found = self._skip()
+                if found is None:
+                    return
+                if found == "}":
+                    self._pos += 1
+                    self._state = "end"
+                    return
+                complete, key = self._value()
+                if not complete:
+                    return
+                if not isinstance(key, str):
+                    raise StreamError("Expected a field name")
+                self._key = key
+                self._state = "colon"
+            elif state == "colon":
+                if not self._expect(":"):
+                    return
+                self._state = "value"
+            elif state == "value":
+                found = self._skip()
+                if found is None:
+                    return
+                if self._key == "entities":
+                    if found != "[":
+                        raise StreamError(f"Expected an array of entities, found {found!r}")
+                    self._pos += 1
+                    self._state = "entity_first"
+                    continue
+                complete, value = self._value()
+                if not complete:
+                    return
+                self.fields[self._key] = value
+                self._state = "next"
+            elif state == "next":
+                found = self._skip()
+                if found is None:
+                    return
+                self._pos += 1
+                if found == ",":
+                    self._state = "key"
+                elif found == "}":
+                    self._state = "end"
+                    return
+                else:
+                    raise StreamError(f"Expected ',' or '}}', found {found!r}")
+            elif state == "entity_first" or state == "entity":
+                if not self._entities():
+                    return
+            elif state == "entity_next":
+                found = self._skip()
+                if found is None:
+                    return
+                self._pos += 1
+                if found == ",":
+                    self._state = "entity"
+                elif found == "]":
+                    self._state = "next"
+                else:
+                    raise StreamError(f"Expected ',' or ']' in entities, found {found!r}")
+            else:
+                return
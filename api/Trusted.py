@@ -0,0 +1,121 @@
+"""
+ Validation free decoding for payloads coming from the trusted game server.
+ Builds the same object graph as `model_validate`, but skips all the checks and coercions,
+ so for example a float field sent as `1` stays `int`. Only missing fields are noticed, they raise `KeyError`.
+ Meant for real matches, keep validation on while developing.
+"""
+from enum import IntEnum
+from types import UnionType
+from typing import Annotated, Any, Callable, Dict, Optional, Type, TypeVar, Union, get_args, get_origin
+
+from pydantic import BaseModel
+
+from api.Types import ExternallyTagged
+
+M = TypeVar("M", bound=BaseModel)
+
+Builder = Optional[Callable[[Any], Any]]
+"""
+ Turns raw JSON value into the decoded one, `None` when the raw value can be used as is.
+"""
+
+_new = object.__new__
+_set = object.__setattr__
+_builders: Dict[Any, Builder] = {}
+
+
+def _model_builder(cls: Type[BaseModel]) -> Builder:
+    # Shared by all instances, setting a field only adds a name that is already there.
+    fields_set = set(cls.model_fields)
+    defaults = tuple((name, field.default) for name, field in cls.model_fields.items() if not field.is_required())
+    required = frozenset(name for name, field in cls.model_fields.items() if field.is_required())
+    private = {name: attribute.get_default() for name, attribute in cls.__private_attributes__.items()} or None
+    nested = []
+    for name, field in cls.model_fields.items():
+        annotation = Annotated[(field.annotation, *field.metadata)] if field.metadata else field.annotation
+        builder = builder_for(annotation)
+        if builder is not None:
+            nested.append((name, builder))
+
+    def build(v: dict) -> BaseModel:
+        # The only check, so a missing field fails here and not later in the bot.
+        if not v.keys() >= required:
+            raise KeyError(min(required - v.keys()))
+        for name, builder in nested:
+            v[name] = builder(v[name])
+        m = _new(cls)
+        _set(m, "__dict__", v)
+        _set(m, "__pydantic_fields_set__", fields_set)
+        _set(m, "__pydantic_extra__", None)
+        _set(m, "__pydantic_private__", None if private is None else private.copy())
+        return m
+
+    def build_with_defaults(v: dict) -> BaseModel:
+        for name, default in defaults:
+            if name not in v:
+                v[name] = default
+        return build(v)
+
+    return build_with_defaults if defaults else build
+
+
+def _tagged_builder(tagged: ExternallyTagged) -> Builder:
+    variants = {tag: builder_for(cls) for tag, cls in tagged.variants.items()}
+
+    def build(v: dict) -> BaseModel:
+        for tag, inner in v.items():
+            return variants[tag](inner)
+
+    return build
+
+
+def _list_builder(item: Builder) -> Builder:
+    if item is None:
+        return None
+    return lambda v: [item(i) for i in v]
+
+
+def _optional_builder(inner: Builder) -> Builder:
+    if inner is None:
+        return None
+    return lambda v: None if v is None else inner(v)
+
+
+def _enum_builder(cls: Type[IntEnum]) -> Builder:
+    return {m.value: m for m in cls}.__getitem__
+
+
+def builder_for(annotation: Any) -> Builder:
+    """
+     Builder for values of the given type annotation, computed once per annotation.
+    """
+    if annotation in _builders:
+        return _builders[annotation]
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Annotated:
+        tagged = next((a for a in annotation.__metadata__ if isinstance(a, ExternallyTagged)), None)
+        builder = _tagged_builder(tagged) if tagged is not None else builder_for(args[0])
+    elif origin is list:
+        builder = _list_builder(builder_for(args[0]))
+    elif origin is Union or origin is UnionType:
+        inner = [a for a in args if a is not type(None)]
+        builder = _optional_builder(builder_for(inner[0])) if len(inner) == 1 else None
+    elif hasattr(annotation, "__value__"):
+        builder = builder_for(annotation.__value__)
+    elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        builder = _model_builder(annotation)
+    elif isinstance(annotation, type) and issubclass(annotation, IntEnum):
+        builder = _enum_builder(annotation)
+    else:
+        builder = None
+    _builders[annotation] = builder
+    return builder
+
+
+def construct(cls: Type[M], raw: dict) -> M:
+    """
+     Decodes parsed JSON `raw` into `cls` without validation.
+     `raw` is reused for the result, so it must not be used afterwards.
+    """
+    return builder_for(cls)(raw)
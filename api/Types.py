@@ -1,22 +1,57 @@
 
+from copy import deepcopy
 from enum import IntEnum
-from typing import List, Dict
+from typing import List, Dict, Annotated, Any, Iterable, get_args
 from api.Maps import Maps
-from pydantic import BaseModel, field_validator, model_serializer
+from pydantic import BaseModel, GetCoreSchemaHandler, model_serializer
+from pydantic_core import core_schema
 from typing import Optional
 
 VERSION = 12
 
 
-def get_class_by_name(class_name: str):
-    # Use the globals() function to access the global namespace
-    global_namespace = globals()
-
-    # Check if the class exists in the global namespace
-    if class_name in global_namespace:
-        return global_namespace[class_name]
-    else:
-        raise ValueError(f"Class '{class_name}' not found")
+class ExternallyTagged:
+    """
+     Marks a union of models, that is sent as externally tagged object, e.g. `{"Health": {"current_hp": 1.0, ...}}`.
+     The tag is the class name without `prefix`.
+     Decoding happens inside pydantic-core: tag is looked up in precomputed table,
+     and the selected variant reads its fields directly from inside the tag.
+     Finding the tag is the only Python call per item, pydantic-core discriminates by the value at a path,
+     while here the tag is the key.
+    """
+    def __init__(self, union: Any, prefix: str):
+        self.variants: Dict[str, type] = {cls.__name__[len(prefix):]: cls for cls in get_args(union)}
+        """
+         Tag to class table.
+        """
+        self.tags: Dict[type, str] = {cls: tag for tag, cls in self.variants.items()}
+        """
+         Class to tag table.
+        """
+
+    def tag_of(self, value: Any) -> Optional[str]:
+        if value.__class__ is dict:
+            for tag in value:
+                return tag
+            return None
+        return self.tags.get(value.__class__)
+
+    def __get_pydantic_core_schema__(self, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        choices = {}
+        for tag, cls in self.variants.items():
+            schema = deepcopy(handler.resolve_ref_schema(handler.generate_schema(cls)))
+            schema.pop('ref', None)
+            fields = deepcopy(schema['schema'])
+            for name, field in schema['schema']['fields'].items():
+                field['validation_alias'] = [tag, name]
+            # The union picks the variant by exact class inside pydantic-core, and the fields are serialized by their
+            # schemas, only the wrapping into the tag is a Python call.
+            schema['serialization'] = core_schema.model_ser_schema(cls, core_schema.any_schema(
+                serialization=core_schema.plain_serializer_function_ser_schema(
+                    lambda value, tag=tag: {tag: value},
+                    return_schema=core_schema.typed_dict_schema({tag: core_schema.typed_dict_field(fields)}))))
+            choices[tag] = schema
+        return core_schema.tagged_union_schema(choices, self.tag_of)
 
 
 class Upgrade(IntEnum):
@@ -371,6 +406,7 @@ AbilityEffectSpecific = \
      AbilityEffectSpecificDamageOverTime |
      AbilityEffectSpecificLinkedFire |
      AbilityEffectSpecificOther)
+AbilityEffectSpecificTags = ExternallyTagged(AbilityEffectSpecific, "AbilityEffectSpecific")
 
 
 class AbilityEffect(BaseModel):
@@ -386,7 +422,7 @@ class AbilityEffect(BaseModel):
     """
      Can be zero, if not provided
     """
-    specific: AbilityEffectSpecific
+    specific: Annotated[AbilityEffectSpecific, AbilityEffectSpecificTags]
 
 
 class AspectPowerProduction(BaseModel):
@@ -690,6 +726,84 @@ Aspect = \
      AspectCollisionBase |
      AspectEditorUniqueID |
      AspectRoam)
+AspectTags = ExternallyTagged(Aspect, "Aspect")
+ASPECT_BITS: Dict[type, int] = {cls: 1 << i for i, cls in enumerate(AspectTags.variants.values())}
+"""
+ Bit of each `Aspect` class in `AspectTable.mask`.
+"""
+
+
+class AspectTable:
+    """
+     Aspects of one entity by class, the first one of each class, and the `ASPECT_BITS` of all of them in `mask`.
+    """
+    __slots__ = ("aspects", "mask", "by_class")
+
+    def __init__(self, aspects: List[Any]):
+        self.aspects = aspects
+        """
+         List the table was built from.
+        """
+        self.mask = 0
+        self.by_class: Dict[type, Any] = {}
+        for aspect in aspects:
+            cls = aspect.__class__
+            self.mask |= ASPECT_BITS.get(cls, 0)
+            self.by_class.setdefault(cls, aspect)
+
+
+class AspectLookup:
+    """
+     Typed access to `aspects` of entities and players, e.g. `entity.health`,
+     in constant time once the `aspect_table` is built on first use.
+     Models using it declare an `_aspect_table` slot, where the table is kept. Being outside `__pydantic_private__`,
+     it is not compared by `==`, so equality does not depend on which entities had their aspects looked up.
+    """
+    __slots__ = ()
+
+    @property
+    def aspect_table(self) -> AspectTable:
+        # Built again when `aspects` is replaced, e.g. by `WorldState`.
+        try:
+            table = self._aspect_table
+        except AttributeError:
+            table = None
+        if table is None or table.aspects is not self.aspects:
+            table = AspectTable(self.aspects)
+            self._aspect_table = table
+        return table
+
+    @property
+    def aspect_mask(self) -> int:
+        """
+         `ASPECT_BITS` of the aspects, e.g. `entity.aspect_mask & ASPECT_BITS[AspectHealth]`.
+        """
+        return self.aspect_table.mask
+
+    def aspect(self, cls: type) -> Optional[Any]:
+        """
+         Aspect of class `cls`, e.g. `AspectTurret`, `None` when the entity does not have it.
+        """
+        return self.aspect_table.by_class.get(cls)
+
+    @property
+    def health(self) -> Optional[AspectHealth]:
+        return self.aspect_table.by_class.get(AspectHealth)
+
+    @property
+    def construction(self) -> Optional[AspectConstructionData]:
+        """
+         Present while a building or barrier is under construction.
+        """
+        return self.aspect_table.by_class.get(AspectConstructionData)
+
+    @property
+    def mode_change(self) -> Optional[AspectModeChange]:
+        return self.aspect_table.by_class.get(AspectModeChange)
+
+    @property
+    def power_production(self) -> Optional[AspectPowerProduction]:
+        return self.aspect_table.by_class.get(AspectPowerProduction)
 
 
 class Job(IntEnum):
@@ -766,11 +880,12 @@ class Orbs(BaseModel):
     """
 
 
-class APIPlayerEntity(BaseModel):
+class APIPlayerEntity(AspectLookup, BaseModel):
     """
      Technically it is specific case of `APIEntity`, but we decided to move players out,
      and move few fields up like position and owning player id
     """
+    __slots__ = ("_aspect_table",)
     id: EntityId
     """
      Unique id of the entity
@@ -779,7 +894,7 @@ class APIPlayerEntity(BaseModel):
     """
      List of effects the entity have.
     """
-    aspects: List[dict] | List[Aspect]
+    aspects: List[Annotated[Aspect, AspectTags]]
     """
      List of aspects entity have.
     """
@@ -790,14 +905,6 @@ class APIPlayerEntity(BaseModel):
     name: str
     orbs: Orbs
 
-    # noinspection PyMethodParameters
-    @field_validator("aspects")
-    def validate_aspects(cls, la: List[Aspect]) -> List[Aspect]:
-        res = []
-        for v in la:
-            res.append(get_class_by_name(f"Aspect{list(v.keys())[0]}")(**v[list(v.keys())[0]]))
-        return res
-
 
 class MatchPlayer(BaseModel):
     name: str
@@ -960,6 +1067,7 @@ APIEntitySpecific = \
 """
  Describes the specific types of entities
 """
+APIEntitySpecificTags = ExternallyTagged(APIEntitySpecific, "APIEntitySpecific")
 
 
 class SingleTargetSingleEntity(BaseModel):
@@ -990,6 +1098,7 @@ SingleTarget = \
 """
  When targeting you can target either entity, or ground coordinates.
 """
+SingleTargetTags = ExternallyTagged(SingleTarget, "SingleTarget")
 
 
 class WalkMode(IntEnum):
@@ -1012,10 +1121,11 @@ class Ping(IntEnum):
     Meet = 5,
 
 
-class APIEntity(BaseModel):
+class APIEntity(AspectLookup, BaseModel):
     """
      Entity on the map
     """
+    __slots__ = ("_aspect_table",)
     id: EntityId
     """
      Unique id of the entity
@@ -1024,7 +1134,7 @@ class APIEntity(BaseModel):
     """
      List of effects the entity have.
     """
-    aspects: List[dict] | List[Aspect]
+    aspects: List[Annotated[Aspect, AspectTags]]
     """
      List of aspects entity have.
     """
@@ -1040,24 +1150,11 @@ class APIEntity(BaseModel):
     """
      id of player that owns this entity
     """
-    specific: Dict[str, dict] | APIEntitySpecific
+    specific: Annotated[APIEntitySpecific, APIEntitySpecificTags]
     """
      Player is different entity from Squad, so this is the specific part.
     """
 
-    # noinspection PyMethodParameters
-    @field_validator("aspects")
-    def validate_aspects(cls, la: List[Aspect]) -> List[Aspect]:
-        res = []
-        for v in la:
-            res.append(get_class_by_name(f"Aspect{list(v.keys())[0]}")(**v[list(v.keys())[0]]))
-        return res
-
-    # noinspection PyMethodParameters
-    @field_validator("specific")
-    def validate_specific(cls, v: APIEntitySpecific) -> APIEntitySpecific:
-        return get_class_by_name(f"APIEntitySpecific{list(v.keys())[0]}")(**v[list(v.keys())[0]])
-
 
 class APICommandBuildHouse(BaseModel):
     """
@@ -1080,7 +1177,7 @@ class APICommandCastSpellGod(BaseModel):
      Play card of Spell type. (single target)
     """
     card_position: int
-    target: SingleTarget
+    target: Annotated[SingleTarget, SingleTargetTags]
 
     @model_serializer
     def as_dict(self):
@@ -1137,7 +1234,7 @@ class APICommandCastSpellEntity(BaseModel):
     """
     entity: EntityId
     spell: SpellId
-    target: SingleTarget
+    target: Annotated[SingleTarget, SingleTargetTags]
 
     @model_serializer
     def as_dict(self):
@@ -1336,6 +1433,7 @@ APICommand = \
 """
  All the different command bot can issue.
 """
+APICommandTags = ExternallyTagged(APICommand, "APICommand")
 
 
 class PlayerCommand(BaseModel):
@@ -1343,12 +1441,7 @@ class PlayerCommand(BaseModel):
      Command that happen.
     """
     player: EntityId
-    command: Dict[str, dict] | APICommand
-
-    # noinspection PyMethodParameters
-    @field_validator("command")
-    def validate_command(cls, v: APICommand) -> APICommand:
-        return get_class_by_name(f"APICommand{list(v.keys())[0]}")(**v[list(v.keys())[0]])
+    command: Annotated[APICommand, APICommandTags]
 
 
 class CommandRejectionReasonOther(BaseModel):
@@ -1515,6 +1608,7 @@ CommandRejectionReason = \
 """
  Reason why command was rejected
 """
+CommandRejectionReasonTags = ExternallyTagged(CommandRejectionReason, "CommandRejectionReason")
 
 
 class RejectedCommand(BaseModel):
@@ -1522,18 +1616,8 @@ class RejectedCommand(BaseModel):
      Command that was rejected.
     """
     player: EntityId
-    reason: Dict[str, dict] | CommandRejectionReason
-    command: Dict[str, dict] | APICommand
-
-    # noinspection PyMethodParameters
-    @field_validator("reason")
-    def validate_reason(cls, v: CommandRejectionReason) -> CommandRejectionReason:
-        return get_class_by_name(f"CommandRejectionReason{list(v.keys())[0]}")(**v[list(v.keys())[0]])
-
-    # noinspection PyMethodParameters
-    @field_validator("command")
-    def validate_command(cls, v: APICommand) -> APICommand:
-        return get_class_by_name(f"APICommand{list(v.keys())[0]}")(**v[list(v.keys())[0]])
+    reason: Annotated[CommandRejectionReason, CommandRejectionReasonTags]
+    command: Annotated[APICommand, APICommandTags]
 
 
 class AiForMapAPI(BaseModel):
@@ -1551,10 +1635,50 @@ class AiForMapAPI(BaseModel):
     """
 
 
+class EntityIndex:
+    """
+     Entities of one state grouped by kind, owner and team, built in a single pass.
+     Lists keep the order of `entities`.
+     Kept by the state in an `_index` slot, outside `__pydantic_private__`, so it is not compared by `==`.
+    """
+    def __init__(self, entities: List[APIEntity], players: List[APIPlayerEntity]):
+        self.players: Dict[EntityId, APIPlayerEntity] = {player.id: player for player in players}
+        self.by_id: Dict[EntityId, APIEntity] = {}
+        self.by_kind: Dict[type, List[APIEntity]] = {}
+        """
+         Keyed by `APIEntitySpecific` class, e.g. `APIEntitySpecificSquad`.
+        """
+        self.by_player: Dict[Optional[EntityId], List[APIEntity]] = {}
+        """
+         Keyed by `player_entity_id`, `None` for entities without owner.
+        """
+        self.by_team: Dict[int, List[APIEntity]] = {}
+        """
+         Keyed by team of the owning player, entities without owner are not included.
+        """
+        team_of = {player.id: player.team for player in players}
+        for entity in entities:
+            self.by_id[entity.id] = entity
+            self.by_kind.setdefault(entity.specific.__class__, []).append(entity)
+            owner = entity.player_entity_id
+            self.by_player.setdefault(owner, []).append(entity)
+            team = team_of.get(owner)
+            if team is not None:
+                self.by_team.setdefault(team, []).append(entity)
+
+    def owned(self, kind: type, player_ids: Iterable[Optional[EntityId]]) -> List[APIEntity]:
+        """
+         Entities of `kind` owned by any of the players.
+        """
+        players = set(player_ids)
+        return [entity for entity in self.by_kind.get(kind, []) if entity.player_entity_id in players]
+
+
 class APIGameStartState(BaseModel):
     """
      Used in `/start` endpoint.
     """
+    __slots__ = ("_index",)
     your_player_id: EntityId
     """
      Tells the bot which player it is supposed to control.
@@ -1567,12 +1691,23 @@ class APIGameStartState(BaseModel):
     """
      All the relevant entities on the map. (For example it does not list all the rocks and trees)
     """
+    @property
+    def index(self) -> EntityIndex:
+        """
+         Built on first use, and reused afterwards.
+        """
+        try:
+            return self._index
+        except AttributeError:
+            self._index = EntityIndex(self.entities, [player.entity for player in self.players])
+            return self._index
 
 
 class APIGameState(BaseModel):
     """
      Used in `/tick` endpoint, on every tick from 2 forward.
     """
+    __slots__ = ("_index",)
     current_tick: int
     """
      Time since start of the match measured in ticks.
@@ -1595,6 +1730,16 @@ class APIGameState(BaseModel):
     """
      All the relevant entities on the map. (For example it does not list all the rocks and trees)
     """
+    @property
+    def index(self) -> EntityIndex:
+        """
+         Built on first use, and reused afterwards.
+        """
+        try:
+            return self._index
+        except AttributeError:
+            self._index = EntityIndex(self.entities, self.players)
+            return self._index
 
 
 class APIPrepare(BaseModel):
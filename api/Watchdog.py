@@ -0,0 +1,123 @@
+"""
+ Runs bot callbacks on a dedicated worker thread with a deadline, so a slow `tick` can not block the server,
+ and the game still gets a response in time.
+"""
+import asyncio
+import logging
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from enum import IntEnum
+from typing import Awaitable, Callable, List
+
+from api.Types import APICommand
+
+logger = logging.getLogger(__name__)
+
+
+class LateTickPolicy(IntEnum):
+    """
+     What to do with commands of a tick, that finished after its deadline.
+    """
+    Discard = 0,
+    CarryOver = 1,
+    """
+     Send them in the response to the next tick.
+    """
+
+
+class Watchdog:
+    """
+     A tick that misses the deadline is answered with the commands it staged so far (see `BotImpl.emit`).
+     Ticks arriving while the worker is still busy are answered right away without calling the bot.
+    """
+
+    def __init__(self, deadline_ms: float, late: LateTickPolicy = LateTickPolicy.Discard,
+                 start_deadline_ms: float = 90.0):
+        self.deadline_ms = deadline_ms
+        self.start_deadline_ms = start_deadline_ms
+        self.late = late
+        self.overruns = 0
+        """
+         Callbacks that missed their deadline.
+        """
+        self.skipped = 0
+        """
+         Ticks not passed to the bot, because it was still busy.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bot")
+        self._pending = 0
+        self._carried: List[APICommand] = []
+
+    def _submit(self, fn: Callable) -> asyncio.Future:
+        self._pending += 1
+        future = asyncio.get_running_loop().run_in_executor(self._executor, fn)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, _: Future):
+        self._pending -= 1
+
+    def _overrun(self, what: str, started: float, deadline_ms: float) -> Callable[[Future], None]:
+        self.overruns += 1
+
+        def log(future: Future):
+            duration = (time.perf_counter() - started) * 1000.0
+            if future.exception() is not None:
+                logger.error("%s missed the %.0f ms deadline and failed after %.1f ms", what, deadline_ms, duration,
+                             exc_info=future.exception())
+            else:
+                logger.warning("%s missed the %.0f ms deadline, took %.1f ms", what, deadline_ms, duration)
+
+        return log
+
+    async def start(self, fn: Callable[[], None]):
+        started = time.perf_counter()
+        future = self._submit(fn)
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.start_deadline_ms / 1000.0)
+        except asyncio.TimeoutError:
+            future.add_done_callback(self._overrun("match_start", started, self.start_deadline_ms))
+
+    async def tick(self, current_tick: int, fn: Callable[[], List[APICommand]],
+                   staged: List[APICommand]) -> List[APICommand]:
+        """
+         `fn` runs the bot tick and returns all its commands, starting with `staged`.
+        """
+        carried, self._carried = self._carried, []
+        if self._pending:
+            self.skipped += 1
+            logger.warning("Tick %d skipped, bot is still busy", current_tick)
+            return carried
+        started = time.perf_counter()
+        future = self._submit(fn)
+        try:
+            return carried + await asyncio.wait_for(asyncio.shield(future), self.deadline_ms / 1000.0)
+        except asyncio.TimeoutError:
+            sent = len(staged)
+            future.add_done_callback(self._overrun(f"Tick {current_tick}", started, self.deadline_ms))
+            if self.late == LateTickPolicy.CarryOver:
+                future.add_done_callback(lambda f: self._carry(f, sent))
+            return carried + staged[:sent]
+
+    async def tick_async(self, current_tick: int, tick: Awaitable[List[APICommand]],
+                         staged: List[APICommand]) -> List[APICommand]:
+        """
+         Runs an `async` tick on the event loop, and cancels it at the deadline.
+         It can only be cancelled while it awaits, so `late` does not apply.
+        """
+        try:
+            return await asyncio.wait_for(tick, self.deadline_ms / 1000.0)
+        except asyncio.TimeoutError:
+            self.overruns += 1
+            logger.warning("Tick %d missed the %.0f ms deadline and was cancelled", current_tick, self.deadline_ms)
+            return list(staged)
+
+    def close(self):
+        """
+         Lets a callback still running finish, but does not wait for it.
+        """
+        self._executor.shutdown(wait=False)
+
+    def _carry(self, future: Future, sent: int):
+        if future.exception() is None:
+            self._carried.extend(future.result()[sent:])
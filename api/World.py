@@ -0,0 +1,119 @@
+"""
+ Entities of the match kept across ticks.
+ `EntityId`s start at 1 and are never reused, so entities live in a dense list indexed by id.
+"""
+from typing import Iterator, List, Optional, Set
+
+from api.Lazy import LazyModel
+from api.Types import APIEntity, APIGameStartState, APIGameState, APIPlayerEntity, EntityId
+
+
+class WorldState:
+    """
+     Fed by the wrapper from `/start` and every `/tick`.
+     An entity keeps the same object for its whole life, changed fields are written into it,
+     so bots can hold references to entities across ticks. With lazy decoding, entities of `/start` are replaced
+     by their proxies on the first tick.
+     Only entities, that are not the same objects as in the previous update, are compared field by field,
+     the wrapper hands out unchanged entities again by `api.EntityCache`.
+    """
+
+    def __init__(self):
+        self.current_tick: int = 0
+        self.players: List[APIPlayerEntity] = []
+        self.added: Set[EntityId] = set()
+        """
+         Entities that appeared in the last update.
+        """
+        self.removed: Set[EntityId] = set()
+        """
+         Entities that disappeared in the last update.
+        """
+        self.changed: Set[EntityId] = set()
+        """
+         Entities, that were already present, but had some field changed in the last update.
+        """
+        self._entities: List[Optional[APIEntity]] = [None]
+        self._last: List[Optional[APIEntity]] = [None]
+        """
+         Entity objects of the last update, by id.
+        """
+        self._alive: Set[EntityId] = set()
+
+    def __len__(self) -> int:
+        return len(self._alive)
+
+    def __iter__(self) -> Iterator[APIEntity]:
+        entities = self._entities
+        return (entities[i] for i in self._alive)
+
+    def __contains__(self, entity_id: EntityId) -> bool:
+        return entity_id in self._alive
+
+    def get(self, entity_id: EntityId) -> Optional[APIEntity]:
+        """
+         Entity if it is present in the last update.
+        """
+        if entity_id in self._alive:
+            return self._entities[entity_id]
+        return None
+
+    def start(self, start: APIGameStartState):
+        self._entities = [None]
+        self._last = [None]
+        self._alive = set()
+        self.current_tick = 0
+        self.players = [player.entity for player in start.players]
+        self._apply(start.entities)
+
+    def update(self, state: APIGameState):
+        self.current_tick = state.current_tick
+        self.players = state.players
+        self._apply(state.entities)
+
+    def _apply(self, entities: List[APIEntity]):
+        rows = self._entities
+        last = self._last
+        added: Set[EntityId] = set()
+        changed: Set[EntityId] = set()
+        alive: Set[EntityId] = set()
+        lazy = bool(entities) and isinstance(entities[0], LazyModel)
+        for new in entities:
+            i = new.raw["id"] if lazy else new.id
+            alive.add(i)
+            if i >= len(rows):
+                rows.extend([None] * (i + 1 - len(rows)))
+                last.extend([None] * (i + 1 - len(last)))
+            old = rows[i]
+            if old is None:
+                rows[i] = new
+                added.add(i)
+            elif last[i] is new:
+                pass
+            elif type(old) is not type(new):
+                # Decoded entity of `/start`, followed by a lazy proxy.
+                rows[i] = new
+                changed.add(i)
+            elif lazy:
+                if old.raw != new.raw:
+                    # Drop only the decoded fields, that changed.
+                    for name in [name for name in old.__dict__ if name != "raw"]:
+                        if old.raw.get(name) != new.raw.get(name):
+                            del old.__dict__[name]
+                    old.raw = new.raw
+                    changed.add(i)
+            else:
+                values = old.__dict__
+                for name, value in new.__dict__.items():
+                    if values[name] != value:
+                        values[name] = value
+                        changed.add(i)
+            last[i] = new
+        removed = self._alive - alive
+        for i in removed:
+            rows[i] = None
+            last[i] = None
+        self.removed = removed
+        self.added = added
+        self.changed = changed
+        self._alive = alive
@@ -1,19 +1,142 @@
+import asyncio
+import json
+import logging
 from abc import ABC, abstractmethod
-from typing import List
-from api.Types import (MapInfo, DeckAPI, APIGameStartState, APIGameState, APICommand, ApiHello, APIPrepare, AiForMapAPI,
-                       VERSION)
+from time import monotonic, perf_counter
+from typing import (Any, AsyncIterator, Awaitable, Callable, ClassVar, Dict, List, NamedTuple, Optional, Sequence,
+                    Tuple, Type, TypeVar, Union)
+from api import Commands, Lazy, Trusted
+from api.Commands import CommandBatch
+from api.EntityCache import EntityCache
+from api.MapCache import MapCache
+from api.Metrics import ServerMetrics
+from api.Projection import Projection
+from api.Recorder import Recorder
+from api.StaticMap import StaticMap
+from api.Stream import EntityStream, StreamError
+from api.Types import (MapInfo, DeckAPI, APIGameStartState, APIGameState, APICommand, APIEntity, ApiHello, EntityId,
+                       APIPrepare, AiForMapAPI, VERSION)
+from api.Watchdog import LateTickPolicy, Watchdog
+from api.World import WorldState
 
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, PrivateAttr, TypeAdapter, ValidationError
+
+logger = logging.getLogger(__name__)
 
 global _BOT
+_TRUSTED = False
+"""
+ Decode `/start` and `/tick` bodies without validation, see `api.Trusted`.
+"""
+_LAZY = False
+"""
+ Decode entities and commands of `/tick` bodies on access, see `api.Lazy`.
+"""
+_REUSE_ENTITIES = False
+"""
+ Reuse decoded entities, that did not change since the previous tick, see `api.EntityCache`.
+"""
+_STREAM = False
+"""
+ Decode entities of `/start` and `/tick` bodies while they are being received, see `api.Stream`.
+"""
+_DEADLINE_MS: Optional[float] = None
+"""
+ Runs the bots with a deadline when set, see `api.Watchdog`.
+"""
+_LATE = LateTickPolicy.Discard
+
+_LOADS: Callable[[bytes], Any] = json.loads
+"""
+ Parses `/start` and `/tick` bodies, `orjson.loads` when serving `fast_app`.
+"""
+_RECORDER: Optional[Recorder] = None
+"""
+ Records the bodies of every match when set.
+"""
+_METRICS = ServerMetrics()
+"""
+ Served by `/metrics`.
+"""
+_MAP_CACHE = MapCache()
+"""
+ Per-map precomputation of the bots, see `BotImpl.map_cache`.
+"""
+
+M = TypeVar("M", bound=BaseModel)
 
 
 class BotImpl(ABC, BaseModel):
+    keep_world: ClassVar[bool] = False
+    """
+     Set to `True` to have `world` updated before `match_start` and every `tick`.
+     Entities unchanged since the previous tick are then handed out again, as with `configure(reuse_entities=True)`,
+     so the bot must not change entities it gets.
+    """
+    keep_map: ClassVar[bool] = False
+    """
+     Set to `True` to have `static_map` built on `/start`, and updated before every `tick`.
+    """
+    projection: ClassVar[Optional[Projection]] = None
+    """
+     Parts of `/start` and `/tick` bodies the bot consumes, the rest is dropped before decoding, e.g.
+     `Projection(kinds={"Squad", "Figure", "Building"}, effects=False)`. `None` decodes everything.
+    """
+    _world: WorldState = PrivateAttr(default_factory=WorldState)
+    _static_map: StaticMap = PrivateAttr(default_factory=StaticMap)
+    _staged: List[APICommand] = PrivateAttr(default_factory=list)
+
     @abstractmethod
     def __init__(self, map_info: MapInfo, deck: DeckAPI):
         super().__init__()
 
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs):
+        super().__pydantic_init_subclass__(**kwargs)
+        if cls.keep_map and cls.projection is not None and not cls.projection.keeps_static_map:
+            raise TypeError(f"{cls.__name__}: `keep_map` needs the slot, barrier and building kinds in `projection`")
+
+    @property
+    def world(self) -> WorldState:
+        """
+         Entities kept across ticks, see `keep_world`.
+        """
+        return self._world
+
+    @property
+    def static_map(self) -> StaticMap:
+        """
+         Slots, barriers and neutral buildings of the map in arrays, see `keep_map`.
+        """
+        return self._static_map
+
+    @property
+    def map_cache(self) -> MapCache:
+        """
+         Results of expensive per-map computation, kept across matches (and across runs with `cache_dir`), e.g.
+         `self._distances = self.map_cache.get(map_info, "distances-v1", lambda: distance_field(map_info))`
+         in `prepare_for_battle`.
+        """
+        return _MAP_CACHE
+
+    def prepare_for_battle(self, map_info: MapInfo, deck: DeckAPI):
+        """
+         Called on `/prepare` of the match, after the bot is created, on a worker thread.
+         The game waits up to 30 s for it, so this is the place for map based computation, see `map_cache`.
+        """
+        pass
+
+    def emit(self, *commands: Union[APICommand, CommandBatch]):
+        """
+         Stages commands of the current tick, they are sent before the ones returned by `tick`.
+         Batches built by `api.Commands` can be staged, or returned from `tick`, along with the commands.
+         When running with a deadline, the commands staged so far are sent even if `tick` does not finish in time.
+        """
+        self._staged.extend(commands)
+
     @staticmethod
     @abstractmethod
     def name() -> str:
@@ -33,11 +156,252 @@ class BotImpl(ABC, BaseModel):
         raise NotImplementedError
 
 
+class Snapshot(NamedTuple):
+    """
+     A tick as seen by the planner of `AsyncBotImpl`.
+     `state` is the decoded state of the tick itself, not a copy: the wrapper never changes it once decoded,
+     and neither should the bot, so the planner can keep reading it while later ticks arrive.
+    """
+    current_tick: int
+    state: APIGameState
+    received: float
+    """
+     `time.monotonic()` when the tick arrived.
+    """
+
+
+class AsyncBotImpl(BotImpl):
+    """
+     Bot with an `async` `tick`, and a `plan` coroutine run as a background task from `match_start`
+     until the match is finished, so it keeps thinking between ticks instead of only in the response window.
+     The planner reads the latest tick by `snapshot` or `next_snapshot`, and hands out the best plan so far
+     by `publish`, `tick` answers with `best_plan`.
+     The planner shares the event loop with the server, it has to `await` between refinement steps
+     (`await asyncio.sleep(0)` will do) to let requests through.
+     Snapshots are neither copied nor frozen, they stay unchanged only by convention, see `Snapshot`.
+     Only `keep_world`, which updates entities of earlier ticks, is rejected, nothing else is checked.
+    """
+    _snapshot: Optional[Snapshot] = PrivateAttr(default=None)
+    _next: Optional[asyncio.Event] = PrivateAttr(default=None)
+    _plan: Any = PrivateAttr(default=None)
+    _planner: Optional[asyncio.Task] = PrivateAttr(default=None)
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs):
+        super().__pydantic_init_subclass__(**kwargs)
+        if cls.keep_world:
+            raise TypeError(f"{cls.__name__}: `keep_world` writes new values into entities of earlier ticks, "
+                            "which would change snapshots under the planner")
+
+    @property
+    def snapshot(self) -> Optional[Snapshot]:
+        """
+         Latest tick, `None` before the first one.
+        """
+        return self._snapshot
+
+    async def next_snapshot(self, after: int = -1) -> Snapshot:
+        """
+         Latest tick, once there is one newer than tick `after`.
+        """
+        while self._snapshot is None or self._snapshot.current_tick <= after:
+            if self._next is None:
+                self._next = asyncio.Event()
+            await self._next.wait()
+        return self._snapshot
+
+    def publish(self, plan: Any):
+        """
+         Replaces the best plan. A published plan is read by `tick` as it is, build a new one instead of changing it.
+        """
+        self._plan = plan
+
+    @property
+    def best_plan(self) -> Any:
+        """
+         Last plan published by the planner, `None` before the first one.
+        """
+        return self._plan
+
+    async def plan(self):
+        """
+         Planner of the match, cancelled when the match is finished. Does nothing by default.
+        """
+
+    @abstractmethod
+    async def tick(self, state: APIGameState) -> List[APICommand]:
+        raise NotImplementedError
+
+    def _observe(self, state: APIGameState):
+        self._snapshot = Snapshot(state.current_tick, state, monotonic())
+        if self._next is not None:
+            self._next.set()
+            self._next = None
+
+    def _start_planner(self):
+        self._stop_planner()
+        self._snapshot = None
+        self._plan = None
+        self._planner = asyncio.get_running_loop().create_task(self.plan(), name=f"{self.name()} planner")
+        self._planner.add_done_callback(_planner_done)
+
+    def _stop_planner(self):
+        if self._planner is not None:
+            self._planner.cancel()
+            self._planner = None
+
+
+def _planner_done(task: asyncio.Task):
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("%s failed", task.get_name(), exc_info=task.exception())
+
+
 app = FastAPI()
 
 
+class Match:
+    """
+     State of one AI slot in one match, so one server can play several matches at once.
+    """
+
+    def __init__(self, key: str, bot: BotImpl):
+        self.key = key
+        self.bot = bot
+        self.your_player_id: Optional[EntityId] = None
+        """
+         Known after `/start`.
+        """
+        self.watchdog = None if _DEADLINE_MS is None else Watchdog(_DEADLINE_MS, _LATE)
+        # Streamed entities are decoded batch by batch as they arrive, they do not go through the cache.
+        self.entity_cache = (EntityCache(_decode_entities, _TRUSTED)
+                             if (_REUSE_ENTITIES or bot.keep_world) and not _LAZY and not _STREAM else None)
+        self.last_request = monotonic()
+
+    def close(self):
+        if self.watchdog is not None:
+            _FINISHED["skylords_deadline_overruns_total"] += self.watchdog.overruns
+            _FINISHED["skylords_ticks_skipped_total"] += self.watchdog.skipped
+            self.watchdog.close()
+        if isinstance(self.bot, AsyncBotImpl):
+            self.bot._stop_planner()
+        _METRICS.finish(self.key)
+        if _RECORDER is not None:
+            _RECORDER.finish(self.key)
+
+
+_MATCHES: Dict[str, Match] = {}
+"""
+ Keyed by the path prefix of the requests, e.g. `m1` for `/m1/tick`, and `""` for plain `/tick`.
+"""
+MATCH_TIMEOUT_S = 60.0
+"""
+ Matches without any request for this long are finished.
+"""
+_FINISHED: Dict[str, int] = {"skylords_deadline_overruns_total": 0, "skylords_ticks_skipped_total": 0}
+"""
+ Watchdog counters of finished matches.
+"""
+
+
+def _replace(key: str, match: Optional[Match]):
+    """
+     Finishes the current match of `key` and the ones, that timed out.
+    """
+    now = monotonic()
+    for old in [m for k, m in _MATCHES.items() if k == key or now - m.last_request > MATCH_TIMEOUT_S]:
+        if old is not match:
+            old.close()
+            del _MATCHES[old.key]
+    if match is not None:
+        _MATCHES[key] = match
+
+
+def _match(key: str) -> Match:
+    """
+     Match of `key`, matches started without `/prepare` are played by the bot passed to `run`.
+    """
+    match = _MATCHES.get(key)
+    if match is None:
+        match = Match(key, _BOT)
+        _replace(key, match)
+    match.last_request = monotonic()
+    return match
+
+
+_MALFORMED = (KeyError, TypeError, AttributeError, IndexError)
+"""
+ Raised by trusted and lazy decoding on bodies, that do not match the models, as they do not check them.
+"""
+
+
+def _loads(body: bytes) -> Any:
+    try:
+        return _LOADS(body)
+    except ValueError as e:
+        # Same as FastAPI, `orjson.JSONDecodeError` is a `json.JSONDecodeError` too.
+        raise RequestValidationError([{"type": "json_invalid", "loc": ("body", getattr(e, "pos", 0)),
+                                       "msg": "JSON decode error", "input": {}, "ctx": {"error": str(e)}}])
+
+
+def _invalid(errors: List[dict], *loc: Union[str, int]) -> RequestValidationError:
+    """
+     `errors` of pydantic, located in the body at `loc`, as FastAPI reports them.
+    """
+    return RequestValidationError([{**error, "loc": ("body", *loc) + tuple(error["loc"])} for error in errors])
+
+
+def _malformed(e: Exception) -> RequestValidationError:
+    if isinstance(e, KeyError):
+        message = f"Field or value {e.args[0]!r} missing or unknown"
+    else:
+        message = f"{type(e).__name__}: {e}"
+    return RequestValidationError([{"type": "value_error", "loc": ("body",), "msg": message, "input": None}])
+
+
+def _decode(cls: Type[M], raw: dict) -> M:
+    if _TRUSTED:
+        return Trusted.construct(cls, raw)
+    try:
+        return cls.model_validate(raw)
+    except ValidationError as e:
+        raise _invalid(e.errors())
+
+
+def _decode_start(match: Match, raw: dict) -> APIGameStartState:
+    projection = match.bot.projection
+    try:
+        return _decode(APIGameStartState, raw if projection is None else projection.start(raw))
+    except _MALFORMED as e:
+        raise _malformed(e)
+
+
+def _decode_tick(match: Match, raw: dict) -> APIGameState:
+    try:
+        return _decode_tick_unchecked(match, raw)
+    except _MALFORMED as e:
+        raise _malformed(e)
+
+
+def _decode_tick_unchecked(match: Match, raw: dict) -> APIGameState:
+    if match.bot.projection is not None:
+        raw = match.bot.projection.tick(raw)
+    if _LAZY:
+        try:
+            return Lazy.game_state(raw)
+        except ValidationError as e:
+            # Players are validated right away.
+            raise _invalid(e.errors(), "players")
+    entities = raw.get("entities") if isinstance(raw, dict) else None
+    if match.entity_cache is None or not isinstance(entities, list) or not all(type(e) is dict for e in entities):
+        return _decode(APIGameState, raw)
+    state = _decode(APIGameState, {**raw, "entities": []})
+    state.entities = match.entity_cache.decode(entities)
+    return state
+
+
 @app.post("/hello")
-async def hello_endpoint(hello: ApiHello) -> AiForMapAPI:
+@app.post("/{key}/hello")
+async def hello_endpoint(hello: ApiHello, key: str = "") -> AiForMapAPI:
     if hello.version != VERSION:  # Check version compatibility
         raise HTTPException(status_code=422, detail="Version mismatch")
 
@@ -46,27 +410,333 @@ async def hello_endpoint(hello: ApiHello) -> AiForMapAPI:
 
 
 @app.post("/prepare")
-async def prepare_endpoint(prepare: APIPrepare):
+@app.post("/{key}/prepare")
+async def prepare_endpoint(prepare: APIPrepare, key: str = ""):
+    await _prepare(prepare, key)
+
+
+async def _prepare(prepare: APIPrepare, key: str):
     deck = prepare.deck
     decks = _BOT.decks_for_map(prepare.map_info)
     supported_deck = next((d for d in decks if d.name == deck), None)
     if supported_deck is None:
         raise HTTPException(status_code=422, detail="Deck not supported on map")
+    bot = _BOT.__class__(prepare.map_info, supported_deck)
+    # Off the event loop, so ticks of other matches are answered meanwhile.
+    await asyncio.get_running_loop().run_in_executor(None, bot.prepare_for_battle, prepare.map_info, supported_deck)
+    _replace(key, Match(key, bot))
+
+
+def _bot_match_start(bot: BotImpl, start: APIGameStartState):
+    if bot.keep_world:
+        bot.world.start(start)
+    if bot.keep_map:
+        bot.static_map.start(start)
+    bot.match_start(start)
+
+
+def _bot_tick(bot: BotImpl, state: APIGameState, staged: List[APICommand]) -> List[APICommand]:
+    bot._staged = staged
+    if bot.keep_world:
+        bot.world.update(state)
+    if bot.keep_map:
+        bot.static_map.update(state)
+    commands = bot.tick(state)
+    return staged + commands
+
+
+async def _bot_tick_async(bot: AsyncBotImpl, state: APIGameState, staged: List[APICommand]) -> List[APICommand]:
+    bot._staged = staged
+    if bot.keep_map:
+        bot.static_map.update(state)
+    bot._observe(state)
+    commands = await bot.tick(state)
+    return staged + commands
+
+
+def _start_match(key: str) -> Match:
+    match = _MATCHES.get(key)
+    if match is None or match.your_player_id is not None:
+        match = Match(key, _BOT)
+    _replace(key, match)
+    return match
+
+
+async def _start(times: List[float], body: bytes, key: str = "") -> bytes:
+    times.append(perf_counter())
+    match = _start_match(key)
+    if _RECORDER is not None:
+        _RECORDER.start(body, key)
+    raw = _loads(body)
+    times.append(perf_counter())
+    start = _decode_start(match, raw)
+    times.append(perf_counter())
+    return await _play_start(times, match, start, key)
+
+
+async def _start_stream(times: List[float], chunks: AsyncIterator[bytes], key: str = "") -> bytes:
+    match = _start_match(key)
+    record = None if _RECORDER is None else _RECORDER.start
+    raw, entities = await _receive(times, chunks, _entity_decoder(False, match.bot.projection), record, key)
+    start = _decode_start(match, raw)
+    start.entities = entities
+    times.append(perf_counter())
+    return await _play_start(times, match, start, key)
+
+
+async def _play_start(times: List[float], match: Match, start: APIGameStartState, key: str) -> bytes:
+    match.your_player_id = start.your_player_id
+    if match.watchdog is None:
+        _bot_match_start(match.bot, start)
+    else:
+        await match.watchdog.start(lambda: _bot_match_start(match.bot, start))
+    if isinstance(match.bot, AsyncBotImpl):
+        match.bot._start_planner()
+    times.append(perf_counter())
+    times.append(perf_counter())
+    _METRICS.observe("start", times, len(start.entities), key)
+    return b"null"
+
+
+async def _tick(times: List[float], body: bytes, key: str = "") -> bytes:
+    times.append(perf_counter())
+    match = _match(key)
+    if _RECORDER is not None:
+        _RECORDER.tick(body, key)
+    raw = _loads(body)
+    times.append(perf_counter())
+    state = _decode_tick(match, raw)
+    times.append(perf_counter())
+    return await _play_tick(times, match, state, key)
+
+
+async def _tick_stream(times: List[float], chunks: AsyncIterator[bytes], key: str = "") -> bytes:
+    match = _match(key)
+    record = None if _RECORDER is None else _RECORDER.tick
+    raw, entities = await _receive(times, chunks, _entity_decoder(_LAZY, match.bot.projection), record, key)
+    state = _decode_tick(match, raw)
+    state.entities = entities
+    times.append(perf_counter())
+    return await _play_tick(times, match, state, key)
+
+
+async def _play_tick(times: List[float], match: Match, state: APIGameState, key: str) -> bytes:
+    staged: List[APICommand] = []
+    if isinstance(match.bot, AsyncBotImpl):
+        tick = _bot_tick_async(match.bot, state, staged)
+        commands = await (tick if match.watchdog is None else
+                          match.watchdog.tick_async(state.current_tick, tick, staged))
+    elif match.watchdog is None:
+        commands = _bot_tick(match.bot, state, staged)
+    else:
+        commands = await match.watchdog.tick(state.current_tick, lambda: _bot_tick(match.bot, state, staged),
+                                             staged)
+    times.append(perf_counter())
+    content = Commands.encode(commands)
+    times.append(perf_counter())
+    _METRICS.observe("tick", times, len(state.entities), key)
+    return content
+
+
+_ENTITIES = TypeAdapter(List[APIEntity])
+
+
+def _decode_entities(batch: List[dict], positions: Sequence[int]) -> List[APIEntity]:
+    """
+     Entities of `batch`, `positions` are their indices in `entities` of the body, where errors are located.
+     Used by `EntityCache` as well.
+    """
+    if _TRUSTED:
+        try:
+            return [Trusted.construct(APIEntity, raw) for raw in batch]
+        except _MALFORMED as e:
+            raise _malformed(e)
+    try:
+        return _ENTITIES.validate_python(batch)
+    except ValidationError as e:
+        raise _invalid([{**error, "loc": (positions[error["loc"][0]],) + error["loc"][1:]} for error in e.errors()],
+                       "entities")
+
+
+def _entity_decoder(lazy: bool, projection: Optional[Projection]) -> Callable[[List[dict], int], List[APIEntity]]:
+    """
+     Decodes a batch of entities, the second argument is the index of the first one in the projected `entities`.
+    """
+    if lazy:
+        decode = lambda batch, _: [Lazy.LazyAPIEntity(raw) for raw in batch]
+    else:
+        decode = lambda batch, first: _decode_entities(batch, range(first, first + len(batch)))
+    if projection is None:
+        return decode
+    return lambda batch, first: decode(projection.entities(batch), first)
+
+
+async def _receive(times: List[float], chunks: AsyncIterator[bytes],
+                   decode: Callable[[List[dict], int], List[APIEntity]],
+                   record: Optional[Callable[[bytes, str], None]], key: str) -> Tuple[dict, List[APIEntity]]:
+    """
+     Parsed body without entities, and the entities, decoded while the rest of the body was still being received,
+     see `api.Stream`.
+    """
+    stream = EntityStream()
+    entities: List[APIEntity] = []
+    body: Optional[List[bytes]] = None if record is None else []
+    try:
+        async for chunk in chunks:
+            entities.extend(decode(stream.feed(chunk), len(entities)))
+            if body is not None:
+                body.append(chunk)
+        times.append(perf_counter())
+        entities.extend(decode(stream.close(), len(entities)))
+    except StreamError as e:
+        raise RequestValidationError([{"type": "json_invalid", "loc": ("body",), "msg": str(e), "input": None}])
+    if body is not None:
+        record(b"".join(body), key)
+    times.append(perf_counter())
+    return {**stream.fields, "entities": []}, entities
 
 
 @app.post("/start")
-async def start_endpoint(start: APIGameStartState):
-    _BOT.match_start(start)
+@app.post("/{key}/start")
+async def start_endpoint(request: Request, key: str = ""):
+    times = [perf_counter()]
+    if _STREAM:
+        return Response(await _start_stream(times, request.stream(), key), media_type="application/json")
+    return Response(await _start(times, await request.body(), key), media_type="application/json")
 
 
 @app.post("/tick")
-async def tick_endpoint(state: APIGameState):
-    commands = _BOT.tick(state)
-    return commands
+@app.post("/{key}/tick")
+async def tick_endpoint(request: Request, key: str = ""):
+    times = [perf_counter()]
+    if _STREAM:
+        return Response(await _tick_stream(times, request.stream(), key), media_type="application/json")
+    return Response(await _tick(times, await request.body(), key), media_type="application/json")
+
+
+def _counters() -> Dict[str, int]:
+    counters = dict(_FINISHED)
+    for match in _MATCHES.values():
+        if match.watchdog is not None:
+            counters["skylords_deadline_overruns_total"] += match.watchdog.overruns
+            counters["skylords_ticks_skipped_total"] += match.watchdog.skipped
+    return counters
 
 
-def run(bot: BotImpl, port: int):
-    global _BOT
+@app.get("/metrics")
+async def metrics_endpoint():
+    return PlainTextResponse(_METRICS.render(_counters(), {"skylords_matches": len(_MATCHES)}),
+                             media_type="text/plain; version=0.0.4")
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    for match in list(_MATCHES.values()):
+        match.close()
+    _MATCHES.clear()
+    if _RECORDER is not None:
+        _RECORDER.close()
+
+
+_FAST_ROUTES: Dict[str, Callable[[List[float], bytes, str], Awaitable[bytes]]] = {"start": _start, "tick": _tick}
+_STREAM_ROUTES: Dict[str, Callable[[List[float], AsyncIterator[bytes], str], Awaitable[bytes]]] = {
+    "start": _start_stream, "tick": _tick_stream}
+
+
+async def _chunks(receive: Callable) -> AsyncIterator[bytes]:
+    while True:
+        message = await receive()
+        yield message.get("body", b"")
+        if not message.get("more_body", False):
+            return
+
+
+async def fast_app(scope: dict, receive: Callable, send: Callable):
+    """
+     ASGI app answering `/start` and `/tick` without going through FastAPI routing and response handling,
+     everything else is passed to `app`.
+    """
+    handler = None
+    if scope["type"] == "http" and scope["method"] == "POST":
+        key, _, endpoint = scope["path"][1:].rpartition("/")
+        if "/" not in key:
+            handler = (_STREAM_ROUTES if _STREAM else _FAST_ROUTES).get(endpoint)
+    if handler is None:
+        await app(scope, receive, send)
+        return
+    times = [perf_counter()]
+    status = 200
+    try:
+        if _STREAM:
+            content = await handler(times, _chunks(receive), key)
+        else:
+            content = await handler(times, b"".join([chunk async for chunk in _chunks(receive)]), key)
+    except RequestValidationError as e:
+        status = 422
+        content = json.dumps({"detail": e.errors()}, default=str).encode()
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode())]})
+    await send({"type": "http.response.body", "body": content})
+
+
+def configure(bot: BotImpl, trusted: bool = False, lazy: bool = False, deadline_ms: Optional[float] = None,
+              late: LateTickPolicy = LateTickPolicy.Discard, fast: bool = False,
+              record_dir: Optional[str] = None, cache_dir: Optional[str] = None,
+              reuse_entities: bool = False, stream: bool = False) -> Callable:
+    """
+     Sets up the wrapper for `bot` and returns the ASGI app to serve, see `run` for the options.
+    """
+    global _BOT, _TRUSTED, _LAZY, _REUSE_ENTITIES, _STREAM, _DEADLINE_MS, _LATE, _RECORDER, _LOADS, _MAP_CACHE
+    if stream and reuse_entities:
+        raise ValueError("`reuse_entities` does not apply to streamed bodies, use one of `stream` and `reuse_entities`")
     _BOT = bot
+    _TRUSTED = trusted
+    _LAZY = lazy
+    _REUSE_ENTITIES = reuse_entities
+    _STREAM = stream
+    _DEADLINE_MS = deadline_ms
+    _LATE = late
+    for match in list(_MATCHES.values()):
+        match.close()
+    _MATCHES.clear()
+    _RECORDER = None if record_dir is None else Recorder(record_dir)
+    _MAP_CACHE = MapCache(cache_dir)
+    if fast:
+        import orjson
+        _LOADS = orjson.loads
+        return fast_app
+    _LOADS = json.loads
+    return app
+
+
+def run(bot: BotImpl, port: int, trusted: bool = False, lazy: bool = False, deadline_ms: Optional[float] = None,
+        late: LateTickPolicy = LateTickPolicy.Discard, fast: bool = False, record_dir: Optional[str] = None,
+        workers: int = 0, affinity: bool = False, cache_dir: Optional[str] = None, reuse_entities: bool = False,
+        stream: bool = False):
+    """
+     `trusted` skips validation of `/start` and `/tick` bodies, use it only against the real game server.
+     `lazy` decodes entities and commands of `/tick` bodies only when the bot accesses them.
+     `deadline_ms` runs the bot on a worker thread, and answers ticks that take longer with the commands
+     staged by `BotImpl.emit` so far, `late` decides what happens with the rest, see `api.Watchdog`.
+     Ticks of an `AsyncBotImpl` run on the event loop, and are cancelled at the deadline instead.
+     `fast` serves `/start` and `/tick` by `fast_app`, with bodies parsed by `orjson`.
+     `record_dir` keeps a log of every match in the directory, see `api.Recorder`.
+     `workers` spreads matches over that many processes, `affinity` pins each of them to one CPU, see `api.Pool`.
+     `cache_dir` keeps `BotImpl.map_cache` in the directory, so per-map computation is reused by later runs.
+     `reuse_entities` decodes only entities, that changed since the previous tick, the others are the same objects
+     as in the previous tick, so the bot must not change them, see `api.EntityCache`.
+     `stream` decodes entities of `/start` and `/tick` while the rest of the body is still being received,
+     see `api.Stream`. It lowers peak memory, as the JSON tree of the whole body is never held, but not latency,
+     which is higher over loopback, and the decoded entities are still held whole. It can not be combined with
+     `reuse_entities`.
+     With `workers` the bodies are received whole by the front-end, and are not streamed.
+    """
     import uvicorn
-    uvicorn.run(app, host="127.0.0.1", port=port)
+    if workers:
+        from api import Pool
+        configure(bot)
+        server = Pool.pool_app(bot, workers, affinity, trusted=trusted, lazy=lazy, deadline_ms=deadline_ms, late=late,
+                               fast=fast, record_dir=record_dir, cache_dir=cache_dir, reuse_entities=reuse_entities)
+    else:
+        server = configure(bot, trusted, lazy, deadline_ms, late, fast, record_dir, cache_dir, reuse_entities, stream)
+    uvicorn.run(server, host="127.0.0.1", port=port)
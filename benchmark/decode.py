@@ -0,0 +1,23 @@
+import json
+import sys
+from typing import List
+
+from api import Trusted
+from api.Types import APIGameState
+from benchmark.fixtures import game_state
+from benchmark.suite import measure
+
+
+def main(scales: List[int]):
+    print(f"{'entities':>10} {'json.loads ms':>14} {'validated ms':>13} {'trusted ms':>11}")
+    for count in scales:
+        body = json.dumps(game_state(count)).encode()
+        parsed = json.loads(body)
+        parse = measure(lambda _: json.loads(body))
+        validated = measure(lambda _: APIGameState.model_validate(parsed))
+        trusted = measure(lambda raw: Trusted.construct(APIGameState, raw), lambda: json.loads(body))
+        print(f"{count:>10} {parse:>14.2f} {validated:>13.2f} {trusted:>11.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 5000, 20000])
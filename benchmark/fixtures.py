@@ -0,0 +1,159 @@
+import random
+from typing import List, Optional
+
+from api.Types import (AbilityLine, APICommand, APICommandCastSpellEntity, APICommandGroupAttack, APICommandGroupGoto,
+                       APICommandProduceSquad, Job, OrbColor, Position2D, SingleTargetLocation,
+                       SingleTargetSingleEntity, WalkMode)
+
+KINDS = ["Squad", "Figure", "Building", "PowerSlot", "TokenSlot", "BarrierModule", "BarrierSet", "Projectile",
+         "AbilityWorldObject"]
+"""
+ Entity kinds generated into the synthetic states.
+"""
+WEIGHTS = [12, 40, 8, 8, 3, 12, 2, 10, 5]
+"""
+ Rough share of each kind on a crowded map.
+"""
+
+
+def _position(rng: random.Random) -> dict:
+    return {"x": rng.uniform(0.0, 1500.0), "y": rng.uniform(0.0, 40.0), "z": rng.uniform(0.0, 1500.0)}
+
+
+def _effect(rng: random.Random, source: int) -> dict:
+    specific = rng.choice([
+        {"DamageOverTime": {"tick_wait_duration": 10, "ticks_left": rng.randint(1, 20), "tick_damage": 12.5}},
+        {"DamageRadialArea": {"progress_current": 0.5, "progress_delta": 0.1, "damage_remaining": 300.0}},
+        {"LinkedFire": {"linked": True, "fighting": False, "fast_cast": 0, "support_cap": 2, "support_production": 1}},
+        {"Other": {}},
+    ])
+    return {"id": rng.randint(1, 5000), "line": int(rng.choice(list(AbilityLine))), "source": source,
+            "source_team": rng.randint(1, 2), "start_tick": 0, "end_tick": 0, "specific": specific}
+
+
+def _health(rng: random.Random, cap: float) -> dict:
+    return {"Health": {"current_hp": rng.uniform(1.0, cap), "cap_current_max": cap}}
+
+
+def _entity(rng: random.Random, entity_id: int, kind: str, players: List[int]) -> dict:
+    owner: Optional[int] = rng.choice(players)
+    aspects: List[dict] = []
+    if kind == "Squad":
+        specific = {"card_id": rng.randint(1, 700) + rng.choice([0, 1000000, 2000000, 3000000]),
+                    "res_squad_id": rng.randint(1, 5000), "bound_power": 100.0, "squad_size": rng.randint(1, 12),
+                    "figures": [entity_id + i + 1 for i in range(rng.randint(1, 4))]}
+        aspects = [{"Combat": {}}, {"SquadRefill": {}}]
+    elif kind == "Figure":
+        specific = {"squad_id": max(1, entity_id - rng.randint(1, 4)), "current_speed": rng.uniform(0.0, 12.0),
+                    "rotation_speed": 3.0, "unit_size": rng.randint(1, 4), "move_mode": 0}
+        aspects = [_health(rng, 800.0), {"Combat": {}}, {"Attackable": {}}]
+    elif kind == "Building":
+        specific = {"building_id": rng.randint(1, 500), "card_id": rng.randint(1, 700), "power_cost": 150.0}
+        aspects = [_health(rng, 2500.0), {"Attackable": {}}]
+        if rng.random() < 0.3:
+            aspects.append({"ConstructionData": {"refresh_count_remaining": rng.randint(0, 50),
+                                                 "refresh_count_total": 50, "health_per_build_update_trigger": 40.0,
+                                                 "remaining_health_to_add": 1000.0}})
+        if rng.random() < 0.2:
+            aspects.append({"ModeChange": {"current_mode": 1, "all_modes": [1, 2]}})
+    elif kind == "PowerSlot":
+        owner = rng.choice(players + [None])
+        specific = {"res_id": 1, "state": rng.randint(0, 3), "team": rng.randint(0, 2)}
+        aspects = [{"PowerProduction": {"current_power": rng.uniform(0.0, 900.0), "power_capacity": 900.0}},
+                   _health(rng, 1000.0)]
+    elif kind == "TokenSlot":
+        owner = rng.choice(players + [None])
+        specific = {"color": int(rng.choice(list(OrbColor)))}
+        aspects = [_health(rng, 1500.0)]
+    elif kind == "BarrierModule":
+        specific = {"team": rng.randint(0, 2), "set": max(1, entity_id - 1), "state": rng.randint(0, 3), "slots": 4,
+                    "free_slots": rng.randint(0, 4), "walkable": rng.random() < 0.5}
+        aspects = [_health(rng, 600.0), {"MountBarrier": {}}]
+    elif kind == "BarrierSet":
+        owner = None
+        specific = {}
+        aspects = [{"RepairBarrierSet": {}}]
+    else:
+        specific = {}
+    effects = [_effect(rng, rng.randint(1, entity_id)) for _ in range(rng.choice([0, 0, 0, 1, 2]))]
+    return {"id": entity_id, "effects": effects, "aspects": aspects, "job": int(rng.choice(list(Job))),
+            "position": _position(rng), "player_entity_id": owner, "specific": {kind: specific}}
+
+
+def entities(count: int, players: List[int], seed: int = 0, first_id: int = 100) -> List[dict]:
+    """
+     `count` raw (JSON like) entities with ids starting at `first_id`.
+    """
+    rng = random.Random(seed)
+    kinds = rng.choices(KINDS, WEIGHTS, k=count)
+    return [_entity(rng, first_id + i, kind, players) for i, kind in enumerate(kinds)]
+
+
+def player_entity(player_id: int, team: int) -> dict:
+    return {"id": player_id, "effects": [], "aspects": [{"PlayerKit": {}}], "team": team, "power": 250.0,
+            "void_power": 0.0, "population_count": 20, "name": f"player{player_id}",
+            "orbs": {"shadow": 0, "nature": 1, "frost": 1, "fire": 0, "starting": 1, "white": 0, "all": 0}}
+
+
+def player_ids(players: int) -> List[int]:
+    return list(range(1, players + 1))
+
+
+def game_state(count: int, players: int = 6, tick: int = 100, seed: int = 0) -> dict:
+    """
+     Raw body of `/tick` with `count` entities.
+    """
+    ids = player_ids(players)
+    return {
+        "current_tick": tick,
+        "commands": [
+            {"player": ids[0], "command": {"GroupGoto": {"squads": [101, 102], "positions": [{"x": 1.0, "y": 2.0}],
+                                                         "walk_mode": 4, "orientation": 0.0}}},
+            {"player": ids[-1], "command": {"ProduceSquad": {"card_position": 0, "xy": {"x": 5.0, "y": 6.0}}}},
+        ],
+        "rejected_commands": [
+            {"player": ids[0], "reason": {"NotEnoughPower": {"player_power": 10.0, "required": 50}},
+             "command": {"ProduceSquad": {"card_position": 0, "xy": {"x": 5.0, "y": 6.0}}}},
+        ],
+        "players": [player_entity(p, 1 + i % 2) for i, p in enumerate(ids)],
+        "entities": entities(count, ids, seed),
+    }
+
+
+def game_start_state(count: int, players: int = 6, seed: int = 0) -> dict:
+    """
+     Raw body of `/start` with `count` entities.
+    """
+    ids = player_ids(players)
+    deck = {"name": "deck", "cover_card_index": 0, "cards": [0] * 20}
+    return {
+        "your_player_id": ids[0],
+        "players": [{"name": f"player{p}", "deck": deck, "entity": player_entity(p, 1 + i % 2)}
+                    for i, p in enumerate(ids)],
+        "entities": entities(count, ids, seed),
+    }
+
+
+def commands(count: int, seed: int = 0) -> List[APICommand]:
+    """
+     `count` commands of a big fight, mostly moving and attacking with groups of squads.
+    """
+    rng = random.Random(seed)
+    result: List[APICommand] = []
+    for _ in range(count):
+        squads = [rng.randint(100, 20000) for _ in range(rng.randint(1, 6))]
+        xy = Position2D(x=rng.uniform(0.0, 1500.0), y=rng.uniform(0.0, 1500.0))
+        roll = rng.random()
+        if roll < 0.45:
+            result.append(APICommandGroupGoto(squads=squads, positions=[xy], walk_mode=WalkMode.Normal,
+                                              orientation=rng.uniform(0.0, 6.28)))
+        elif roll < 0.85:
+            result.append(APICommandGroupAttack(squads=squads, target_entity_id=rng.randint(100, 20000),
+                                                force_attack=False))
+        elif roll < 0.95:
+            result.append(APICommandProduceSquad(card_position=rng.randint(0, 19), xy=xy))
+        else:
+            target = SingleTargetLocation(xy=xy) if rng.random() < 0.5 else \
+                SingleTargetSingleEntity(id=rng.randint(100, 20000))
+            result.append(APICommandCastSpellEntity(entity=squads[0], spell=rng.randint(1, 3000), target=target))
+    return result
@@ -0,0 +1,151 @@
+"""
+ Local stand-in for the game, drives a running bot over HTTP in the order the game does:
+ `/hello`, `/prepare`, `/start`, then `/tick` every 100 ms (or as fast as the bot answers), e.g.
+
+ `python run.py example/example.py 7079` and `python -m benchmark.game --port 7079 --entities 2000 --growth 5`
+
+ States are synthetic, the commands the bot returns are sent back in `commands` of the next tick.
+"""
+import argparse
+import http.client
+import json
+import random
+import sys
+import time
+from typing import List, Optional
+
+import numpy as np
+
+from api.Maps import Maps
+from api.Types import VERSION
+from benchmark.fixtures import entities, game_start_state, player_entity, player_ids
+
+DEADLINES_MS = (50.0, 90.0)
+
+
+class MockReport:
+    def __init__(self, round_trips: List[float], entity_counts: List[int]):
+        self.round_trips = np.array(round_trips)
+        """
+         Milliseconds of each `/tick`.
+        """
+        self.entity_counts = entity_counts
+
+    def misses(self, deadline_ms: float) -> int:
+        return int(np.count_nonzero(self.round_trips > deadline_ms))
+
+    def render(self) -> str:
+        if not len(self.round_trips):
+            return "no ticks"
+        p50, p90, p99 = np.percentile(self.round_trips, [50, 90, 99])
+        lines = [f"{len(self.round_trips)} ticks, {self.entity_counts[0]} to {self.entity_counts[-1]} entities",
+                 f"round-trip ms p50 {p50:.2f} p90 {p90:.2f} p99 {p99:.2f} max {self.round_trips.max():.2f}"]
+        lines += [f"over {deadline:g} ms: {self.misses(deadline)}" for deadline in DEADLINES_MS]
+        return "\n".join(lines)
+
+
+class MockGame:
+    """
+     One match against the bot. Entities are encoded once and only the moving ones are encoded again,
+     so building large states does not slow the tick rate down.
+    """
+
+    def __init__(self, host: str, port: int, entity_count: int = 1000, growth: float = 0.0,
+                 max_entities: int = 20000, ticks: int = 300, interval_ms: Optional[float] = 100.0,
+                 map_name: Maps = Maps.ElyonSpectator, players: int = 6, your_player_id: int = 1, seed: int = 0,
+                 moving: float = 0.1, match: str = ""):
+        """
+         `growth` entities are added every tick, up to `max_entities`.
+         `interval_ms` of `None` sends the next tick as soon as the previous one is answered.
+         `moving` is the share of entities, that change position every tick.
+         `match` is the path prefix of the requests, so several games can be played by one bot server.
+        """
+        self.connection = http.client.HTTPConnection(host, port)
+        self.entity_count = entity_count
+        self.growth = growth
+        self.max_entities = max(max_entities, entity_count)
+        self.ticks = ticks
+        self.interval_ms = interval_ms
+        self.map_info = {"map": str(map_name)}
+        self.players = player_ids(players)
+        self.your_player_id = your_player_id
+        self.moving = moving
+        self.prefix = f"/{match}" if match else ""
+        self._rng = random.Random(seed)
+        self._entities = entities(self.max_entities, self.players, seed)
+        self._encoded = [json.dumps(entity) for entity in self._entities]
+        self._players = json.dumps([player_entity(p, 1 + i % 2) for i, p in enumerate(self.players)])
+
+    def _post(self, path: str, body: object) -> object:
+        content = body if isinstance(body, bytes) else json.dumps(body)
+        self.connection.request("POST", self.prefix + path, content, {"Content-Type": "application/json"})
+        response = self.connection.getresponse()
+        content = response.read()
+        if response.status != 200:
+            raise RuntimeError(f"{path} failed with {response.status}: {content[:200]!r}")
+        return json.loads(content) if content else None
+
+    def _move(self, count: int):
+        for i in self._rng.sample(range(count), int(count * self.moving)):
+            position = self._entities[i]["position"]
+            position["x"] += self._rng.uniform(-2.0, 2.0)
+            position["z"] += self._rng.uniform(-2.0, 2.0)
+            self._encoded[i] = json.dumps(self._entities[i])
+
+    def _tick_body(self, tick: int, count: int, commands: List[object]) -> bytes:
+        echoed = json.dumps([{"player": self.your_player_id, "command": command} for command in commands])
+        return (f'{{"current_tick":{tick},"commands":{echoed},"rejected_commands":[],"players":{self._players},'
+                f'"entities":[{",".join(self._encoded[:count])}]}}').encode()
+
+    def run(self) -> MockReport:
+        hello = self._post("/hello", {"version": VERSION, "map": self.map_info})
+        if not hello["decks"]:
+            raise RuntimeError(f"{hello['name']} has no deck for {self.map_info['map']}")
+        self._post("/prepare", {"deck": hello["decks"][0]["name"], "map_info": self.map_info})
+        start = game_start_state(self.entity_count, len(self.players))
+        start["your_player_id"] = self.your_player_id
+        start["entities"] = self._entities[:self.entity_count]
+        self._post("/start", start)
+
+        round_trips = []
+        entity_counts = []
+        commands: List[object] = []
+        began = time.perf_counter()
+        for tick in range(1, self.ticks + 1):
+            count = min(self.max_entities, self.entity_count + int(self.growth * tick))
+            self._move(count)
+            body = self._tick_body(tick, count, commands)
+            if self.interval_ms is not None:
+                # Keeps the game clock, a late tick is followed right away by the next one.
+                delay = began + tick * self.interval_ms / 1000.0 - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            sent = time.perf_counter()
+            commands = self._post("/tick", body) or []
+            round_trips.append((time.perf_counter() - sent) * 1000.0)
+            entity_counts.append(count)
+        self.connection.close()
+        return MockReport(round_trips, entity_counts)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmark.game", description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7079)
+    parser.add_argument("--entities", type=int, default=1000, help="entities of the first tick")
+    parser.add_argument("--growth", type=float, default=0.0, help="entities added every tick")
+    parser.add_argument("--max-entities", type=int, default=20000)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--interval", type=float, default=100.0, help="ms between ticks")
+    parser.add_argument("--flat-out", action="store_true", help="send ticks as fast as the bot answers")
+    parser.add_argument("--map", default=str(Maps.ElyonSpectator), choices=[str(m) for m in Maps])
+    args = parser.parse_args(argv)
+
+    game = MockGame(args.host, args.port, args.entities, args.growth, args.max_entities, args.ticks,
+                    None if args.flat_out else args.interval, Maps(args.map))
+    print(game.run().render())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,72 @@
+"""
+ Tick latency of concurrent matches, served by one process and by a pool of worker processes (`api.Pool`).
+ Every match is played by its own mock game process (`benchmark.game`) at the real tick rate.
+"""
+import argparse
+import multiprocessing
+import socket
+import sys
+import time
+from typing import List
+
+import numpy as np
+import uvicorn
+
+from api import Pool, Wrapper
+from benchmark.game import DEADLINES_MS, MockGame
+from benchmark.server import EchoBot
+
+PORT = 7279
+
+
+def _serve(workers: int):
+    bot = EchoBot()
+    app = Pool.pool_app(bot, workers, affinity=True) if workers else None
+    Wrapper.configure(bot)
+    uvicorn.run(app or Wrapper.app, host="127.0.0.1", port=PORT, log_level="warning")
+
+
+def _play(args) -> List[float]:
+    match, entities, ticks = args
+    game = MockGame("127.0.0.1", PORT, entities, ticks=ticks, match=f"m{match}", your_player_id=1 + match % 6,
+                    seed=match)
+    return game.run().round_trips.tolist()
+
+
+def _wait_for_server():
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", PORT), timeout=1.0).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmark.pool", description=__doc__)
+    parser.add_argument("--matches", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--entities", type=int, default=1000)
+    parser.add_argument("--ticks", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    print(f"{'matches':>8} {'mode':>8} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+          + "".join(f" {f'>{deadline:g} ms':>8}" for deadline in DEADLINES_MS))
+    for matches in args.matches:
+        for workers in (0, matches):
+            server = multiprocessing.Process(target=_serve, args=(workers,))
+            server.start()
+            _wait_for_server()
+            with multiprocessing.Pool(matches) as games:
+                results = games.map(_play, [(i, args.entities, args.ticks) for i in range(matches)])
+            server.terminate()
+            server.join()
+            round_trips = np.concatenate([np.array(r) for r in results])
+            p50, p99 = np.percentile(round_trips, [50, 99])
+            mode = f"{workers} proc" if workers else "single"
+            print(f"{matches:>8} {mode:>8} {p50:>8.2f} {p99:>8.2f} {round_trips.max():>8.2f}"
+                  + "".join(f" {int(np.count_nonzero(round_trips > d)):>8}" for d in DEADLINES_MS))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
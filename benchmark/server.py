@@ -0,0 +1,82 @@
+import http.client
+import json
+import sys
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+import uvicorn
+
+from api import Wrapper
+from api.Types import (APICommand, APICommandGroupAttack, APICommandProduceSquad, APIGameStartState, APIGameState,
+                       DeckAPI, MapInfo, Position2D)
+from benchmark.fixtures import game_start_state, game_state
+
+PORT = 7179
+
+
+class EchoBot(Wrapper.BotImpl):
+    """
+     Spends no time in the bot, so the round-trip is all server overhead.
+    """
+
+    def __init__(self, map_info: Optional[MapInfo] = None, deck: Optional[DeckAPI] = None):
+        super().__init__(map_info, deck)
+
+    @staticmethod
+    def name() -> str:
+        return "EchoBot"
+
+    @staticmethod
+    def decks_for_map(map_info: MapInfo) -> List[DeckAPI]:
+        return [DeckAPI(name="echo", cover_card_index=0, cards=[])]
+
+    def match_start(self, state: APIGameStartState):
+        pass
+
+    def tick(self, state: APIGameState) -> List[APICommand]:
+        return [APICommandProduceSquad(card_position=0, xy=Position2D(x=10.0, y=20.0)),
+                APICommandGroupAttack(squads=[1, 2, 3], target_entity_id=4, force_attack=False)]
+
+
+def round_trips(fast: bool, start: bytes, tick: bytes, requests: int) -> np.ndarray:
+    """
+     Milliseconds of each `/tick` round-trip over one keep-alive loopback connection.
+    """
+    config = uvicorn.Config(Wrapper.configure(EchoBot(), trusted=True, fast=fast), host="127.0.0.1", port=PORT,
+                            log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    connection = http.client.HTTPConnection("127.0.0.1", PORT)
+    connection.request("POST", "/start", start, {"Content-Type": "application/json"})
+    connection.getresponse().read()
+    times = []
+    for _ in range(requests):
+        began = time.perf_counter()
+        connection.request("POST", "/tick", tick, {"Content-Type": "application/json"})
+        connection.getresponse().read()
+        times.append(time.perf_counter() - began)
+    connection.close()
+    server.should_exit = True
+    thread.join()
+    return np.array(times) * 1000.0
+
+
+def main(scales: List[int], requests: int = 200):
+    print(f"{'entities':>10} {'mode':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for count in scales:
+        start = json.dumps(game_start_state(count)).encode()
+        tick = json.dumps(game_state(count)).encode()
+        for fast in (False, True):
+            times = round_trips(fast, start, tick, requests)
+            p50, p90, p99 = np.percentile(times, [50, 90, 99])
+            print(f"{count:>10} {'fast' if fast else 'fastapi':>8} {p50:>8.2f} {p90:>8.2f} {p99:>8.2f} "
+                  f"{times.max():>8.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [0, 100, 1000, 5000])
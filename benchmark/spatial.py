@@ -0,0 +1,25 @@
+import sys
+from typing import List
+
+import numpy as np
+
+from api.Columns import EntityColumns
+from api.Spatial import SpatialIndex
+from benchmark.fixtures import entities, player_ids
+from benchmark.suite import measure
+
+
+def main(scales: List[int], queries: int = 200, radius: float = 60.0, k: int = 8):
+    print(f"{'entities':>10} {'rebuild ms':>11} {f'{queries} within ms':>16} {f'{queries} nearest ms':>17}")
+    for count in scales:
+        columns = EntityColumns.from_raw(entities(count, player_ids(6)))
+        points = np.random.default_rng(0).uniform(0.0, 1500.0, (queries, 2))
+        index = SpatialIndex.from_columns(columns)
+        rebuild = measure(lambda _: SpatialIndex.from_columns(columns))
+        within = measure(lambda _: index.within(points, radius))
+        nearest = measure(lambda _: index.nearest(points, k))
+        print(f"{count:>10} {rebuild:>11.2f} {within:>16.2f} {nearest:>17.2f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 10000, 20000])
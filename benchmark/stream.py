@@ -0,0 +1,64 @@
+"""
+ `/start` of large maps with the body decoded whole and streamed (`api.Stream`), over a loopback connection:
+ round-trip latency, and peak memory allocated while serving it.
+"""
+import http.client
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from typing import List, Tuple
+
+import numpy as np
+import uvicorn
+
+from api import Wrapper
+from benchmark.fixtures import game_start_state
+from benchmark.server import EchoBot
+
+PORT = 7379
+
+
+def start_round_trips(stream: bool, start: bytes, requests: int) -> Tuple[np.ndarray, float]:
+    """
+     Milliseconds of each `/start` round-trip, and the peak of memory allocated during one of them in MB.
+    """
+    config = uvicorn.Config(Wrapper.configure(EchoBot(), fast=True, stream=stream), host="127.0.0.1", port=PORT,
+                            log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    connection = http.client.HTTPConnection("127.0.0.1", PORT)
+    times = []
+    for _ in range(requests):
+        began = time.perf_counter()
+        connection.request("POST", "/start", start, {"Content-Type": "application/json"})
+        connection.getresponse().read()
+        times.append(time.perf_counter() - began)
+    # Measured separately, tracing slows the requests down.
+    tracemalloc.start()
+    connection.request("POST", "/start", start, {"Content-Type": "application/json"})
+    connection.getresponse().read()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    connection.close()
+    server.should_exit = True
+    thread.join()
+    return np.array(times) * 1000.0, peak / 1024 / 1024
+
+
+def main(scales: List[int], requests: int = 10):
+    print(f"{'entities':>10} {'mode':>8} {'p50 ms':>8} {'max ms':>8} {'peak MB':>8}")
+    for count in scales:
+        start = json.dumps(game_start_state(count)).encode()
+        for stream in (False, True):
+            times, peak = start_round_trips(stream, start, requests)
+            print(f"{count:>10} {'stream' if stream else 'whole':>8} {np.percentile(times, 50):>8.2f} "
+                  f"{times.max():>8.2f} {peak:>8.1f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1000, 5000, 20000])
@@ -0,0 +1,197 @@
+"""
+ Decode and encode benchmarks of the api layer, with machine-readable results, e.g.
+ `python -m benchmark.suite --output baseline.json` once, then after changes
+ `python -m benchmark.suite --baseline baseline.json`, which exits with 1 when a metric regressed.
+ A metric only regresses when it is still worse after being measured again, see `confirm`.
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Annotated, Any, Callable, Dict, List, Tuple
+
+from pydantic import TypeAdapter
+
+from api import Commands, Lazy, Trusted
+from api.Projection import Projection
+from api.Types import APICommand, APICommandTags, APIGameState
+from benchmark.fixtures import commands, game_state
+
+SCALES = [100, 1000, 5000, 20000]
+"""
+ Entities per tick.
+"""
+COMMAND_COUNTS = [10, 100, 1000]
+PROJECTIONS = {
+    "no_effects": Projection(effects=False),
+    "no_missiles": Projection(kinds={"Squad", "Building", "PowerSlot", "TokenSlot", "BarrierSet", "BarrierModule"},
+                              effects=False),
+    "health_only": Projection(aspects={"Health"}, effects=False, commands=False, rejected_commands=False),
+    "squads": Projection(kinds={"Squad"}, aspects=(), effects=False, commands=False, rejected_commands=False),
+}
+"""
+ Common projections: without `Projectile`, `AbilityWorldObject` and `Figure` entities, or only reading health.
+"""
+NOISE = 0.1
+"""
+ Relative differences below this are within the run-to-run noise of the medians, not regressions,
+ whatever the threshold is.
+"""
+REFERENCE_METRICS = frozenset({"parse_ms"})
+"""
+ Reported for scale, but not compared, they measure no code of this repository (`json.loads`).
+"""
+
+_COMMANDS = TypeAdapter(List[Annotated[APICommand, APICommandTags]])
+
+
+def measure(fn: Callable[[Any], object], setup: Callable[[], Any] = lambda: None, repeat: int = 15) -> float:
+    """
+     Median wall time of `fn(setup())` in milliseconds, after one call to warm up, `setup` is not timed.
+    """
+    fn(setup())
+    times = []
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000.0
+
+
+def peak_mb(fn: Callable[[Any], object], setup: Callable[[], Any] = lambda: None) -> float:
+    """
+     Peak of memory allocated by `fn(setup())` in MB, `setup` is not counted.
+    """
+    arg = setup()
+    tracemalloc.start()
+    try:
+        fn(arg)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1e6
+
+
+def decode_metrics(count: int, repeat: int) -> Dict[str, float]:
+    body = json.dumps(game_state(count)).encode()
+    parsed = lambda: json.loads(body)
+    validate = lambda raw: APIGameState.model_validate(raw)
+    trusted = lambda raw: Trusted.construct(APIGameState, raw)
+    return {
+        "parse_ms": measure(lambda _: json.loads(body), repeat=repeat),
+        "validated_ms": measure(validate, parsed, repeat),
+        "trusted_ms": measure(trusted, parsed, repeat),
+        "lazy_ms": measure(Lazy.game_state, parsed, repeat),
+        "validated_peak_mb": peak_mb(validate, parsed),
+        "trusted_peak_mb": peak_mb(trusted, parsed),
+    }
+
+
+def projection_metrics(count: int, repeat: int) -> Dict[str, float]:
+    """
+     Validated decode with each of `PROJECTIONS` applied to the parsed body, projecting included.
+    """
+    body = json.dumps(game_state(count)).encode()
+    parsed = lambda: json.loads(body)
+    metrics = {"all_ms": measure(APIGameState.model_validate, parsed, repeat)}
+    for name, projection in PROJECTIONS.items():
+        metrics[f"{name}_ms"] = measure(lambda raw: APIGameState.model_validate(projection.tick(raw)), parsed, repeat)
+    return metrics
+
+
+def encode_metrics(count: int, repeat: int) -> Dict[str, float]:
+    batch = commands(count)
+    return {
+        "pydantic_ms": measure(lambda _: _COMMANDS.dump_json(batch), repeat=repeat),
+        "encode_ms": measure(lambda _: Commands.encode(batch), repeat=repeat),
+    }
+
+
+GROUPS: Dict[str, Callable[[int, int], Dict[str, float]]] = {
+    "decode": decode_metrics, "projection": projection_metrics, "encode": encode_metrics}
+
+
+def run(scales: List[int], command_counts: List[int], repeat: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+     `{"decode": {entities: metrics}, "projection": {entities: metrics}, "encode": {commands: metrics}}`,
+     all metrics are lower is better.
+    """
+    return {
+        "decode": {str(count): decode_metrics(count, repeat) for count in scales},
+        "projection": {str(count): projection_metrics(count, repeat) for count in scales},
+        "encode": {str(count): encode_metrics(count, repeat) for count in command_counts},
+    }
+
+
+def flatten(results: Dict[str, Dict[str, Dict[str, float]]]) -> Dict[str, float]:
+    return {f"{group}/{scale}/{name}": value
+            for group, scales in results.items() for scale, metrics in scales.items()
+            for name, value in metrics.items()}
+
+
+def compare(results: Dict, baseline: Dict, threshold: float) -> List[Tuple[str, float, float]]:
+    """
+     Metrics present in both, that got worse by more than `threshold` (relative, at least `NOISE`).
+    """
+    current = flatten(results)
+    limit = 1.0 + max(threshold, NOISE)
+    regressions = []
+    for name, before in flatten(baseline).items():
+        after = current.get(name)
+        if name.rpartition("/")[2] in REFERENCE_METRICS or after is None:
+            continue
+        if after > before * limit:
+            regressions.append((name, before, after))
+    return regressions
+
+
+def confirm(results: Dict, baseline: Dict, threshold: float, repeat: int, rounds: int = 2
+            ) -> List[Tuple[str, float, float]]:
+    """
+     Regressions, that are still there after measuring their groups `rounds` more times, each metric counting
+     with its best median of all the runs, so a single noisy run does not fail the comparison.
+     `results` are updated with the best medians.
+    """
+    for _ in range(rounds):
+        regressions = compare(results, baseline, threshold)
+        if not regressions:
+            return []
+        for group, scale in {tuple(name.split("/")[:2]) for name, _, _ in regressions}:
+            again = GROUPS[group](int(scale), repeat)
+            metrics = results[group][scale]
+            for name, value in again.items():
+                metrics[name] = min(metrics[name], value)
+    return compare(results, baseline, threshold)
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmark.suite", description=__doc__)
+    parser.add_argument("--scales", type=int, nargs="+", default=SCALES, help="entities per tick")
+    parser.add_argument("--commands", type=int, nargs="+", default=COMMAND_COUNTS, help="commands per tick")
+    parser.add_argument("--repeat", type=int, default=15, help="timed runs, of which the median is reported")
+    parser.add_argument("--output", help="write results as JSON to this file instead of stdout")
+    parser.add_argument("--baseline", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative regression to fail on")
+    args = parser.parse_args(argv)
+
+    results = run(args.scales, args.commands, args.repeat)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = confirm(results, json.load(file), args.threshold, args.repeat)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    for name, before, after in regressions:
+        print(f"REGRESSION {name}: {before:.3f} -> {after:.3f} ({after / before - 1.0:+.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -1,4 +1,4 @@
-from typing import List
+from typing import ClassVar, List
 
 from pydantic import BaseModel
 
@@ -17,6 +17,8 @@ from api.Wrapper import BotImpl
 
 
 class MyBot(BotImpl, BaseModel):
+    keep_map: ClassVar[bool] = True
+
     def __init__(self, map_info: MapInfo, deck: DeckAPI):
         super().__init__(map_info, deck)
         self._my_id = 0
@@ -107,21 +109,21 @@ class MyBot(BotImpl, BaseModel):
         entities = state.entities
         print("Current tick: " + str(current_tick) + " entities count: " + str(len(entities)))
 
-        my_army = []
         target = None
         my_power = 0.0
 
-        for player in state.players:
-            if player.id == self.get_id():
-                my_power = player.power
+        # Entities grouped by kind and owner, built once per tick
+        index = state.index
+        me = index.players.get(self.get_id())
+        if me is not None:
+            my_power = me.power
 
-        for entity in entities:
-            if entity.specific.__class__ is Types.APIEntitySpecificSquad:
-                if self.get_id() == entity.player_entity_id:
-                    my_army.append(entity.id)
-            elif entity.specific.__class__ is Types.APIEntitySpecificTokenSlot:
-                if entity.player_entity_id in self.get_opponents():
-                    target = entity.id
+        my_army = [entity.id for entity in index.owned(Types.APIEntitySpecificSquad, [self.get_id()])]
+        # Token slots are sorted out once on /start, only their owners are updated every tick
+        token_slots = self.static_map.token_slots
+        enemy_monuments = token_slots.id[token_slots.owned_by(self.get_opponents())]
+        if len(enemy_monuments):
+            target = int(enemy_monuments[-1])
 
         print(f'Current tick: {current_tick} target: {target} my power: {my_power} my army: {my_army}')
 
@@ -136,8 +138,11 @@ class MyBot(BotImpl, BaseModel):
         return commands
 
 
-def main(port: int):
+def create_bot() -> MyBot:
     mapinfo = MapInfo(map=Maps.ElyonSpectator, community_map_details=None)
     deck = MyBot.decks_for_map(mapinfo)[0]
-    bot = MyBot(mapinfo, deck)
-    api.Wrapper.run(bot, port)
+    return MyBot(mapinfo, deck)
+
+
+def main(port: int):
+    api.Wrapper.run(create_bot(), port)
@@ -1,9 +1,42 @@
 import sys
 import importlib.util
 
+
+def load(botpath: str):
+    modparent = botpath.split('/')[-2]
+    botname = botpath.split('/')[-1][:-3]
+    modulename = modparent + "." + botname
+
+    spec = importlib.util.spec_from_file_location(modulename, botpath)
+    b = importlib.util.module_from_spec(spec)
+    sys.modules[modulename] = b
+    spec.loader.exec_module(b)
+    return b
+
+
+def replay(argv):
+    if len(argv) < 4:
+        print("Invalid arguments! " +
+              "Replay takes the path to the bot implementation and the path to the recording, " +
+              "optionally followed by --trusted, --lazy and --reuse-entities.")
+        quit()
+    b = load(argv[2])
+    if not hasattr(b, "create_bot"):
+        print("The bot implementation needs a create_bot() function returning the bot to replay.")
+        quit()
+
+    from api.Replay import replay as replay_match
+    report = replay_match(b.create_bot(), argv[3], trusted="--trusted" in argv[4:], lazy="--lazy" in argv[4:],
+                          reuse_entities="--reuse-entities" in argv[4:])
+    print(report.render())
+
+
 if __name__ == "__main__":
     argv = sys.argv
     port = 7079
+    if len(argv) > 1 and argv[1] == "replay":
+        replay(argv)
+        quit()
     if len(argv) > 3 or len(argv) < 2:
         print("Invalid arguments! " +
               "First argument should be the path to the bot implementation, " +
@@ -14,14 +47,4 @@ if __name__ == "__main__":
     else:
         port = int(argv[2])
 
-    botpath = argv[1]
-    modparent = botpath.split('/')[-2]
-    botname = botpath.split('/')[-1][:-3]
-    modulename = modparent + "." + botname
-
-    spec = importlib.util.spec_from_file_location(modulename, botpath)
-    b = importlib.util.module_from_spec(spec)
-    sys.modules[modulename] = b
-    spec.loader.exec_module(b)
-
-    b.main(port)
+    load(argv[1]).main(port)
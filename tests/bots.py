@@ -0,0 +1,31 @@
+from typing import ClassVar, List, Optional
+
+from api.Types import APICommand, APIGameStartState, APIGameState, DeckAPI, MapInfo
+from api.Wrapper import BotImpl
+
+
+class RecordingBot(BotImpl):
+    """
+     Keeps the states it gets, answers without commands.
+    """
+    keep_world: ClassVar[bool] = False
+    starts: ClassVar[List[APIGameStartState]] = []
+    ticks: ClassVar[List[APIGameState]] = []
+
+    def __init__(self, map_info: Optional[MapInfo] = None, deck: Optional[DeckAPI] = None):
+        super().__init__(map_info, deck)
+
+    @staticmethod
+    def name() -> str:
+        return "recording"
+
+    @staticmethod
+    def decks_for_map(map_info: MapInfo) -> List[DeckAPI]:
+        return []
+
+    def match_start(self, state: APIGameStartState):
+        self.starts.append(state)
+
+    def tick(self, state: APIGameState) -> List[APICommand]:
+        self.ticks.append(state)
+        return []
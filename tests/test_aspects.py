@@ -0,0 +1,48 @@
+import copy
+from typing import Callable
+
+import pytest
+
+from api import Lazy, Trusted
+from api.Types import APIGameState, AspectHealth, AspectTags
+from benchmark.fixtures import game_state
+
+DECODERS = {
+    "validated": APIGameState.model_validate,
+    "trusted": lambda raw: Trusted.construct(APIGameState, raw),
+    "lazy": Lazy.game_state,
+}
+
+
+@pytest.mark.parametrize("decode", DECODERS.values(), ids=DECODERS.keys())
+def test_typed_lookup(decode: Callable[[dict], APIGameState]):
+    raw = game_state(30)
+    state = decode(copy.deepcopy(raw))
+    for entity, raw_entity in zip(state.entities, raw["entities"]):
+        tags = [next(iter(aspect)) for aspect in raw_entity["aspects"]]
+        assert (entity.health is not None) == ("Health" in tags)
+        for tag, cls in AspectTags.variants.items():
+            assert (entity.aspect(cls) is not None) == (tag in tags)
+    for player in state.players:
+        assert player.aspect_table.aspects is player.aspects
+
+
+def test_table_follows_replaced_aspects():
+    state = APIGameState.model_validate(game_state(30))
+    entity = next(e for e in state.entities if e.health is not None)
+    assert entity.aspect_table is entity.aspect_table
+    entity.aspects = [AspectHealth(current_hp=1.0, cap_current_max=2.0)]
+    assert entity.health.current_hp == 1.0 and entity.aspect_table.aspects is entity.aspects
+
+
+def test_equality_does_not_depend_on_lookups():
+    raw = game_state(10)
+    a = APIGameState.model_validate(copy.deepcopy(raw))
+    b = APIGameState.model_validate(copy.deepcopy(raw))
+    entity = next(i for i, e in enumerate(a.entities) if e.health is not None)
+    assert a.entities[entity] == b.entities[entity]
+    b.entities[entity].health
+    assert a.entities[entity] == b.entities[entity]
+    assert a.players[0].aspect_table is not b.players[0].aspect_table
+    assert a.players[0] == b.players[0]
+    assert a.entities[entity].model_copy() == a.entities[entity]
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from api.CardTemplate import CardTemplate
+from api.Cards import CardTable, CardType, combine, split
+from api.Helpers import new_card_id
+from api.Types import OrbColor, Upgrade
+
+DATA = """template,name,type,power_cost,white,shadow,nature,frost,fire
+253,Northguards,Unit,70,1,0,0,1,0
+287,Tremor,Spell,50,,,,,2
+999999,Unlisted,Building,120,0,1,0,0,0
+288,,,,,,,,
+"""
+
+
+@pytest.fixture
+def table(tmp_path) -> CardTable:
+    path = tmp_path / "cards.csv"
+    path.write_text(DATA, encoding="utf-8")
+    return CardTable.load(str(path))
+
+
+def test_split_and_combine():
+    ids = [new_card_id(CardTemplate.Northguards, Upgrade.U0), new_card_id(CardTemplate.Tremor, Upgrade.U3)]
+    templates, upgrades = split(ids)
+    assert templates.tolist() == [253, 287] and upgrades.tolist() == [0, 3]
+    assert combine(templates, upgrades).tolist() == ids
+
+
+def test_load(table):
+    assert table.name[999999] == "Unlisted" and table.type[999999] == CardType.Building
+    assert table.name[288] == CardTemplate(288).name and table.known[288]
+    assert table.type[287] == CardType.Spell and table.power_cost[287] == 50.0
+    assert table.orbs[253].tolist() == [1, 0, 0, 1, 0]
+    assert table.orbs[287, OrbColor.Fire] == 2 and table.orbs[287, OrbColor.White] == -1
+    assert not table.known[CardTemplate.NotACard] and not table.known[1]
+
+
+def test_rows_of_unknown_templates(table):
+    ids = [new_card_id(CardTemplate.Tremor, Upgrade.U2), 1, 10 ** 9 + 5, -3]
+    assert table.rows(ids).tolist() == [287, 0, 0, 0]
+
+
+def test_army_questions(table):
+    army = [new_card_id(CardTemplate.Northguards, Upgrade.U1), 253, 287 + int(Upgrade.U3)]
+    assert table.total_power_cost(army) == 190.0
+    assert table.composition(army + [288]).tolist() == [1, 2, 0, 1]
+    with pytest.raises(ValueError, match="288"):
+        table.total_power_cost(army + [288])
+    with pytest.raises(ValueError, match=r"\[1\]"):
+        table.total_power_cost([1])
+
+
+def test_without_data_fails():
+    table = CardTable()
+    assert table.name[253] == "Northguards" and np.isnan(table.power_cost[253])
+    with pytest.raises(ValueError):
+        table.total_power_cost([253])
+    with pytest.raises(ValueError):
+        table.composition([253])
+
+
+def test_template(table):
+    assert table.template(287 + int(Upgrade.U1)) is CardTemplate.Tremor
+    assert table.template(CardTemplate.NotACard) is CardTemplate.NotACard
+    assert table.template(1) is None and table.template(999999) is None
@@ -0,0 +1,31 @@
+import json
+import math
+
+import numpy as np
+
+from api.Commands import encode, group_goto
+from api.Types import APICommandGroupGoto, Position2D, WalkMode
+
+
+def _goto(squad: int, x: float, y: float) -> APICommandGroupGoto:
+    return APICommandGroupGoto(squads=[squad], positions=[Position2D(x=x, y=y)], walk_mode=WalkMode.Normal,
+                               orientation=0.0)
+
+
+def test_group_goto_matches_models():
+    x = np.array([1.0, -2.5, 1e20])
+    y = np.array([0.1, 3.0, 0.0])
+    batch = group_goto(np.array([7, 8, 9]), x, y)
+    expected = [_goto(squad, x_i, y_i) for squad, x_i, y_i in zip([7, 8, 9], x.tolist(), y.tolist())]
+    assert json.loads(encode([batch])) == json.loads(encode(expected))
+
+
+def test_group_goto_non_finite_is_valid_json():
+    batch = group_goto(np.array([1, 2]), np.array([math.nan, math.inf]), np.array([0.0, -math.inf]))
+
+    def reject(constant):
+        raise ValueError(constant)
+
+    decoded = json.loads(encode([batch]), parse_constant=reject)
+    positions = [command["GroupGoto"]["positions"][0] for command in decoded]
+    assert positions == [{"x": None, "y": 0.0}, {"x": None, "y": None}]
@@ -0,0 +1,54 @@
+import numpy as np
+
+from api.MapCache import MapCache
+from api.Types import MapInfo, Maps
+
+MAPS = [MapInfo(map=m) for m in list(Maps)[:3]]
+
+
+class Counter:
+    def __init__(self, value=None):
+        self.calls = 0
+        self.value = value
+
+    def __call__(self):
+        self.calls += 1
+        return self.value
+
+
+def test_computed_once_and_kept_on_disk(tmp_path):
+    compute = Counter(np.arange(10.0))
+    assert MapCache(str(tmp_path)).get(MAPS[0], "distances", compute)[3] == 3.0
+    cache = MapCache(str(tmp_path))
+    assert np.array_equal(cache.get(MAPS[0], "distances", compute), np.arange(10.0))
+    assert compute.calls == 1 and cache.hits == 1
+
+
+def test_none_is_cached(tmp_path):
+    compute = Counter()
+    for _ in range(3):
+        assert MapCache(str(tmp_path)).get(MAPS[0], "nothing", compute) is None
+    assert compute.calls == 1
+
+
+def test_memory_keeps_the_most_recently_used(tmp_path):
+    cache = MapCache(str(tmp_path), max_loaded=2)
+    compute = Counter({"graph": 1})
+    for map_info in MAPS[:2]:
+        cache.get(map_info, "graph", compute)
+    cache.get(MAPS[0], "graph", compute)
+    cache.get(MAPS[2], "graph", compute)
+    assert len(cache._loaded) == 2 and len(cache._computing) == 2
+    assert cache.get(MAPS[1], "graph", compute) == {"graph": 1}
+    # Loaded again from disk, not computed.
+    assert compute.calls == 3
+
+
+def test_without_directory():
+    cache = MapCache(max_loaded=1)
+    compute = Counter(1)
+    cache.get(MAPS[0], "a", compute)
+    cache.get(MAPS[0], "a", compute)
+    cache.get(MAPS[1], "a", compute)
+    cache.get(MAPS[0], "a", compute)
+    assert compute.calls == 3
@@ -0,0 +1,109 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from api import Wrapper
+from api.Metrics import PHASES, TIME_BUCKETS, Histogram, ServerMetrics
+from benchmark.fixtures import game_start_state, game_state
+from tests.bots import RecordingBot
+
+
+def _times(start: float, *durations: float) -> list:
+    times = [start]
+    for duration in durations:
+        times.append(times[-1] + duration)
+    return times
+
+
+def _samples(text: str) -> dict:
+    samples = {}
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            samples[name] = float(value)
+    return samples
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram((1.0, 2.0, 4.0))
+    for value in (0.5, 1.0, 1.5, 3.0, 10.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1, 1]
+    assert (histogram.count, histogram.sum, histogram.max) == (5, 16.0, 10.0)
+    assert histogram.quantile(0.2) == 0.5
+    assert histogram.quantile(0.5) == 1.5
+    assert histogram.quantile(1.0) == 10.0
+    assert Histogram((1.0,)).quantile(0.5) == 0.0
+
+
+def test_render():
+    metrics = ServerMetrics()
+    metrics.observe("tick", _times(10.0, 0.001, 0.002, 0.003, 0.017, 0.001), 120, "a")
+    metrics.observe("tick", _times(10.13, 0.001, 0.002, 0.003, 0.035, 0.001), 80, "a")
+    text = metrics.render({"skylords_ticks_skipped_total": 3}, {"skylords_matches": 1})
+    samples = _samples(text)
+    assert text.endswith("\n")
+    assert "# TYPE skylords_request_seconds histogram" in text.splitlines()
+    bot = 'endpoint="tick",phase="bot"'
+    assert samples[f"skylords_request_phase_seconds_bucket{{{bot},le=\"0.015\"}}"] == 0
+    assert samples[f"skylords_request_phase_seconds_bucket{{{bot},le=\"0.03\"}}"] == 1
+    assert samples[f"skylords_request_phase_seconds_bucket{{{bot},le=\"0.04\"}}"] == 2
+    assert samples[f"skylords_request_phase_seconds_bucket{{{bot},le=\"+Inf\"}}"] == 2
+    assert samples[f"skylords_request_phase_seconds_count{{{bot}}}"] == 2
+    assert abs(samples[f"skylords_request_phase_seconds_sum{{{bot}}}"] - 0.052) < 1e-6
+    assert abs(samples[f"skylords_request_phase_seconds_quantile{{{bot},quantile=\"1\"}}"] - 0.035) < 1e-6
+    assert samples['skylords_request_seconds_count{endpoint="start"}'] == 0
+    assert samples['skylords_entities_bucket{le="100"}'] == 1
+    assert samples["skylords_tick_jitter_seconds_count"] == 1
+    assert abs(samples["skylords_tick_jitter_seconds_sum"] - 0.03) < 1e-6
+    assert samples["skylords_ticks_skipped_total"] == 3 and samples["skylords_matches"] == 1
+    # Every bucket series is cumulative and ends with +Inf.
+    buckets = [name for name in samples if name.startswith(f"skylords_request_phase_seconds_bucket{{{bot}")]
+    assert len(buckets) == len(TIME_BUCKETS) + 1 and buckets[-1].endswith('le="+Inf"}')
+    counts = [samples[name] for name in buckets]
+    assert counts == sorted(counts)
+
+
+def test_merge():
+    a, b = ServerMetrics(), ServerMetrics()
+    a.observe("tick", _times(1.0, *[0.001] * len(PHASES)), 10, "a")
+    b.observe("tick", _times(5.0, *[0.2] * len(PHASES)), 1000, "b")
+    b.observe("start", _times(4.0, *[0.01] * len(PHASES)), 1000, "b")
+    a.merge(b)
+    assert a.total["tick"].count == 2 and a.total["start"].count == 1
+    assert a.phases[("tick", "bot")].max > 0.19
+    assert abs(a.phases[("tick", "read")].sum - 0.201) < 1e-9
+    assert a.entities.count == 2 and a.entities.max == 1000
+    expected = ServerMetrics()
+    expected.observe("tick", _times(1.0, *[0.001] * len(PHASES)), 10, "a")
+    expected.observe("tick", _times(5.0, *[0.2] * len(PHASES)), 1000, "b")
+    expected.observe("start", _times(4.0, *[0.01] * len(PHASES)), 1000, "b")
+    assert _samples(a.render({})) == _samples(expected.render({}))
+
+
+def test_jitter_is_per_match():
+    metrics = ServerMetrics()
+    metrics.observe("tick", _times(1.0, 0.001), 10, "a")
+    metrics.observe("tick", _times(1.05, 0.001), 10, "b")
+    metrics.observe("tick", _times(1.1, 0.001), 10, "a")
+    assert metrics.jitter.count == 1 and metrics.jitter.max < 1e-9
+    metrics.observe("start", _times(2.0, 0.001), 10, "a")
+    metrics.finish("b")
+    assert metrics._last_tick == {}
+    metrics.observe("tick", _times(3.0, 0.001), 10, "a")
+    assert metrics.jitter.count == 1
+
+
+def test_finished_matches_are_forgotten(monkeypatch):
+    with TestClient(Wrapper.configure(RecordingBot())) as client:
+        for key in ("a", "b"):
+            assert client.post(f"/{key}/start", json=game_start_state(10)).status_code == 200
+            assert client.post(f"/{key}/tick", json=game_state(10)).status_code == 200
+        assert {"a", "b"} <= Wrapper._METRICS._last_tick.keys()
+        monkeypatch.setattr(Wrapper, "MATCH_TIMEOUT_S", 0.0)
+        time.sleep(0.01)
+        assert client.post("/c/start", json=game_start_state(10)).status_code == 200
+        assert not {"a", "b"} & Wrapper._METRICS._last_tick.keys()
+        assert client.post("/c/tick", json=game_state(10)).status_code == 200
+        assert "c" in Wrapper._METRICS._last_tick
+    assert "c" not in Wrapper._METRICS._last_tick
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+from typing import Callable, ClassVar, List, Optional
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import Commands, Wrapper
+from api.Types import APICommand, APICommandGroupAttack, APIGameStartState, APIGameState, DeckAPI, MapInfo
+from api.Wrapper import AsyncBotImpl
+from benchmark.fixtures import game_start_state, game_state
+
+
+def _attack(tick: int) -> APICommand:
+    return APICommandGroupAttack(squads=[1], target_entity_id=tick, force_attack=False)
+
+
+class PlanningBot(AsyncBotImpl):
+    """
+     Plans an attack on the entity numbered as the latest tick, and answers with the best plan.
+    """
+    events: ClassVar[List[str]] = []
+    seen: ClassVar[List[int]] = []
+
+    def __init__(self, map_info: Optional[MapInfo] = None, deck: Optional[DeckAPI] = None):
+        super().__init__(map_info, deck)
+
+    @staticmethod
+    def name() -> str:
+        return "planning"
+
+    @staticmethod
+    def decks_for_map(map_info: MapInfo) -> List[DeckAPI]:
+        return []
+
+    def match_start(self, state: APIGameStartState):
+        pass
+
+    async def plan(self):
+        self.events.append("started")
+        try:
+            after = -1
+            while True:
+                snapshot = await self.next_snapshot(after)
+                after = snapshot.current_tick
+                self.seen.append(after)
+                self.publish([_attack(after)])
+        except asyncio.CancelledError:
+            self.events.append("stopped")
+            raise
+
+    async def tick(self, state: APIGameState) -> List[APICommand]:
+        return list(self.best_plan or [])
+
+
+@pytest.fixture
+def bot() -> PlanningBot:
+    PlanningBot.events = []
+    PlanningBot.seen = []
+    return PlanningBot()
+
+
+def _wait(condition: Callable[[], bool]):
+    deadline = time.monotonic() + 5.0
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_tick_answers_with_published_plan(bot):
+    with TestClient(Wrapper.configure(bot)) as client:
+        assert client.post("/start", json=game_start_state(10)).status_code == 200
+        _wait(lambda: bot.events == ["started"])
+        assert client.post("/tick", json=game_state(10, tick=1)).json() == []
+        _wait(lambda: bot.seen == [1])
+        response = client.post("/tick", json=game_state(10, tick=2))
+        assert response.json() == json.loads(Commands.encode([_attack(1)]))
+        _wait(lambda: bot.seen == [1, 2])
+        assert bot.snapshot.current_tick == 2 and bot.snapshot.state.current_tick == 2
+        assert bot.best_plan == [_attack(2)]
+
+
+def test_planner_restarts_with_the_match(bot):
+    with TestClient(Wrapper.configure(bot)) as client:
+        assert client.post("/start", json=game_start_state(10)).status_code == 200
+        assert client.post("/tick", json=game_state(10, tick=5)).status_code == 200
+        _wait(lambda: bot.seen == [5])
+        assert client.post("/start", json=game_start_state(10)).status_code == 200
+        _wait(lambda: bot.events == ["started", "stopped", "started"])
+        # Nothing of the previous match is handed to the new planner.
+        assert bot.snapshot is None and bot.best_plan is None
+        assert client.post("/tick", json=game_state(10, tick=1)).json() == []
+        _wait(lambda: bot.seen == [5, 1])
+    assert bot.events == ["started", "stopped", "started", "stopped"]
+
+
+def test_planner_stops_when_the_match_times_out(bot, monkeypatch):
+    with TestClient(Wrapper.configure(bot)) as client:
+        assert client.post("/a/start", json=game_start_state(10)).status_code == 200
+        _wait(lambda: bot.events == ["started"])
+        monkeypatch.setattr(Wrapper, "MATCH_TIMEOUT_S", 0.0)
+        time.sleep(0.01)
+        assert client.post("/b/tick", json=game_state(10)).status_code == 200
+        _wait(lambda: bot.events == ["started", "stopped"])
+        assert "a" not in Wrapper._MATCHES
+
+
+def test_next_snapshot_waits_for_a_newer_tick(bot):
+    async def play():
+        waiting = asyncio.create_task(bot.next_snapshot())
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        bot._observe(APIGameState.model_validate(game_state(5, tick=1)))
+        assert (await waiting).current_tick == 1
+        # The latest tick is returned right away, once it is newer.
+        assert (await bot.next_snapshot(0)).current_tick == 1
+        waiting = asyncio.create_task(bot.next_snapshot(1))
+        await asyncio.sleep(0)
+        bot._observe(APIGameState.model_validate(game_state(5, tick=1)))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        # Ticks may be skipped, the planner only gets the latest one.
+        bot._observe(APIGameState.model_validate(game_state(5, tick=2)))
+        bot._observe(APIGameState.model_validate(game_state(5, tick=3)))
+        assert (await waiting).current_tick == 3
+
+    asyncio.run(play())
+
+
+def test_publish_replaces_the_plan(bot):
+    assert bot.best_plan is None
+    plan = [_attack(1)]
+    bot.publish(plan)
+    assert bot.best_plan is plan
+    bot.publish(None)
+    assert bot.best_plan is None
+
+
+def test_keep_world_is_rejected():
+    with pytest.raises(TypeError):
+        class WorldBot(PlanningBot):
+            keep_world: ClassVar[bool] = True
@@ -0,0 +1,87 @@
+import os
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import ClassVar, List
+
+from fastapi.testclient import TestClient
+
+from api import Pool, Wrapper
+from api.Types import DeckAPI, MapInfo, Maps
+from benchmark.fixtures import game_start_state, game_state
+from tests.bots import RecordingBot
+
+DECK = DeckAPI(name="deck", cover_card_index=0, cards=[0] * 20)
+PREPARE = {"deck": "deck", "map_info": {"map": next(iter(Maps)).value}}
+
+
+class SlowPrepareBot(RecordingBot):
+    prepare_s: ClassVar[float] = 1.5
+
+    @staticmethod
+    def decks_for_map(map_info: MapInfo) -> List[DeckAPI]:
+        return [DECK]
+
+    def prepare_for_battle(self, map_info: MapInfo, deck: DeckAPI):
+        time.sleep(self.prepare_s)
+
+
+def test_prepare_does_not_hold_up_other_matches():
+    app = Pool.pool_app(SlowPrepareBot(), workers=1)
+    with TestClient(app) as client:
+        assert client.post("/a/start", json=game_start_state(10)).status_code == 200
+        with ThreadPoolExecutor(1) as executor:
+            prepare = executor.submit(client.post, "/b/prepare", json=PREPARE)
+            time.sleep(0.2)
+            began = time.perf_counter()
+            assert client.post("/a/tick", json=game_state(10)).status_code == 200
+            assert time.perf_counter() - began < SlowPrepareBot.prepare_s / 2
+            assert prepare.result().status_code == 200
+
+
+def test_dead_worker_answers_503_and_new_matches_move_on():
+    app = Pool.pool_app(RecordingBot(), workers=2)
+    with TestClient(app) as client:
+        assert client.post("/a/start", json=game_start_state(10)).status_code == 200
+        worker = app._assigned["a"][0]
+        os.kill(worker.process.pid, signal.SIGKILL)
+        worker.process.join(5.0)
+        deadline = time.monotonic() + 5.0
+        while worker.alive and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert not worker.alive
+        assert client.post("/b/start", json=game_start_state(10)).status_code == 200
+        assert app._assigned["b"][0] is not worker
+        assert client.get("/metrics").status_code == 200
+
+
+def test_pending_request_fails_when_worker_dies():
+    app = Pool.pool_app(SlowPrepareBot(), workers=1)
+    with TestClient(app) as client:
+        with ThreadPoolExecutor(1) as executor:
+            prepare = executor.submit(client.post, "/a/prepare", json=PREPARE)
+            time.sleep(0.5)
+            os.kill(app.workers[0].process.pid, signal.SIGKILL)
+            assert prepare.result(timeout=5.0).status_code == 503
+
+
+def test_malformed_body_is_422():
+    app = Pool.pool_app(RecordingBot(), workers=1, trusted=True)
+    tick = game_state(10)
+    del tick["current_tick"]
+    with TestClient(app) as client:
+        assert client.post("/a/start", content=b'{"your_player_id"').status_code == 422
+        assert client.post("/a/tick", json=tick).status_code == 422
+        assert client.post("/a/start", json=game_start_state(10)).status_code == 200
+
+
+def test_timed_out_matches_are_dropped(monkeypatch):
+    app = Pool.pool_app(RecordingBot(), workers=1)
+    try:
+        app._worker("a", False)
+        app._worker("b", True)
+        monkeypatch.setattr(Wrapper, "MATCH_TIMEOUT_S", 0.0)
+        app._worker("c", False)
+        assert list(app._assigned) == ["c"]
+    finally:
+        app.close()
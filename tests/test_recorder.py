@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from api.Recorder import Recorder, Recording
+from benchmark.fixtures import game_start_state, game_state
+
+
+def _record(directory, ticks, keyframe_interval):
+    recorder = Recorder(str(directory), keyframe_interval=keyframe_interval)
+    recorder.start(json.dumps(game_start_state(5)).encode())
+    states = {}
+    for tick in ticks:
+        state = game_state(5, tick=tick)
+        state["entities"][0]["position"]["x"] = float(tick)
+        states[tick] = state
+        recorder.tick(json.dumps(state).encode())
+    recorder.close()
+    (path,) = directory.glob("*.rec")
+    return Recording(str(path)), states
+
+
+def test_ticks_round_trip(tmp_path):
+    recording, states = _record(tmp_path, range(0, 30), keyframe_interval=10)
+    assert list(recording.ticks()) == list(states.values())
+
+
+@pytest.mark.parametrize("tick,expected", [(0, 0), (9, 9), (10, 9), (40, 39), (71, 69), (89, 87), (1000, 87)])
+def test_seek_with_stride_not_dividing_keyframe_interval(tmp_path, tick, expected):
+    # Blocks start at ticks 0, 12, 21, 30, 42, 51, 60, 72, 81, so the tick sought is often before the first
+    # tick of its block.
+    recording, states = _record(tmp_path, range(0, 90, 3), keyframe_interval=10)
+    assert recording.seek(tick) == states[expected]
+
+
+def test_seek_before_first_tick(tmp_path):
+    recording, _ = _record(tmp_path, range(5, 20), keyframe_interval=10)
+    assert recording.seek(4) is None
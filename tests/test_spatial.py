@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from api.Columns import EntityColumns
+from api.Spatial import SpatialIndex
+from benchmark.fixtures import game_state
+
+# Clustered positions with duplicates, a far outlier, and points outside the grid.
+RNG = np.random.default_rng(5)
+X = np.concatenate([RNG.uniform(0, 400, 300), RNG.normal(100, 3, 100), [100.0] * 5, [5000.0]])
+Z = np.concatenate([RNG.uniform(-50, 350, 300), RNG.normal(200, 3, 100), [200.0] * 5, [-3000.0]])
+POINTS = np.concatenate([np.column_stack([RNG.uniform(-100, 500, 40), RNG.uniform(-150, 450, 40)]),
+                         [[100.0, 200.0], [5000.0, -3000.0], [-10000.0, 10000.0]]])
+MASKS = {"all": None, "some": RNG.random(len(X)) < 0.3, "one": np.arange(len(X)) == 17,
+         "none": np.zeros(len(X), dtype=bool)}
+
+
+def _distances(px: float, pz: float) -> np.ndarray:
+    return np.sqrt((X - px) ** 2 + (Z - pz) ** 2)
+
+
+@pytest.mark.parametrize("cell_size", [1.0, 16.0, 32.0, 1000.0])
+@pytest.mark.parametrize("mask", MASKS.values(), ids=MASKS.keys())
+@pytest.mark.parametrize("radius", [0.0, 5.0, 40.0, 700.0])
+def test_within_matches_brute_force(cell_size, mask, radius):
+    index = SpatialIndex(X, Z, cell_size)
+    for (px, pz), rows in zip(POINTS, index.within(POINTS, radius, mask)):
+        expected = _distances(px, pz) <= radius
+        if mask is not None:
+            expected &= mask
+        assert sorted(rows) == list(np.flatnonzero(expected))
+
+
+@pytest.mark.parametrize("cell_size", [1.0, 16.0, 32.0, 1000.0])
+@pytest.mark.parametrize("mask", MASKS.values(), ids=MASKS.keys())
+@pytest.mark.parametrize("k", [1, 3, 8])
+def test_nearest_matches_brute_force(cell_size, mask, k):
+    index = SpatialIndex(X, Z, cell_size)
+    rows, distances = index.nearest(POINTS, k, mask)
+    assert rows.shape == distances.shape == (len(POINTS), k)
+    for (px, pz), found, found_distances in zip(POINTS, rows, distances):
+        d = _distances(px, pz)
+        candidates = np.arange(len(X)) if mask is None else np.flatnonzero(mask)
+        expected = np.sort(d[candidates])[:k]
+        n = len(expected)
+        # Ties may pick different rows, the distances must be the same.
+        assert np.allclose(found_distances[:n], expected)
+        assert np.allclose(d[found[:n]], expected) and len(set(found[:n])) == n
+        assert mask is None or mask[found[:n]].all()
+        assert (found[n:] == -1).all() and np.isinf(found_distances[n:]).all()
+
+
+def test_empty_index():
+    index = SpatialIndex(np.empty(0), np.empty(0))
+    assert [len(rows) for rows in index.within(POINTS[:3], 100.0)] == [0, 0, 0]
+    rows, distances = index.nearest(POINTS[:3], 2)
+    assert (rows == -1).all() and np.isinf(distances).all()
+
+
+def test_from_columns():
+    columns = EntityColumns.from_raw(game_state(100)["entities"])
+    index = SpatialIndex.from_columns(columns)
+    point = np.array([columns.x[0], columns.z[0]])
+    rows, _ = index.nearest(point, len(columns))
+    d = np.hypot(columns.x - point[0], columns.z - point[1])
+    assert np.allclose(d[rows[0]], np.sort(d))
+    assert sorted(index.within(point, 50.0)[0]) == list(np.flatnonzero(d <= 50.0))
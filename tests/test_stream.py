@@ -0,0 +1,77 @@
+import json
+from typing import ClassVar
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import Wrapper
+from api.Stream import EntityStream, StreamError
+from benchmark.fixtures import game_start_state, game_state
+from tests.bots import RecordingBot
+
+
+def _parse(body: bytes, chunk: int) -> tuple:
+    stream = EntityStream()
+    entities = []
+    for i in range(0, len(body), chunk):
+        entities += stream.feed(body[i:i + chunk])
+    entities += stream.close()
+    return stream.fields, entities
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 1 << 20])
+def test_entities_and_fields(chunk):
+    raw = game_state(20)
+    fields, entities = _parse(json.dumps(raw).encode(), chunk)
+    assert entities == raw["entities"]
+    assert fields == {key: value for key, value in raw.items() if key != "entities"}
+
+
+@pytest.mark.parametrize("chunk", [1, 1 << 20])
+@pytest.mark.parametrize("body", [b'{"entities": [ ]}', b'{"entities":[]}'])
+def test_empty_entities(body, chunk):
+    assert _parse(body, chunk) == ({}, [])
+
+
+@pytest.mark.parametrize("chunk", [1, 1 << 20])
+@pytest.mark.parametrize("body", [b'{"entities": [{"id": 1},]}', b'{"entities": [{"id": 1}, ]}',
+                                  b'{"entities": [,]}'])
+def test_trailing_comma_is_rejected(body, chunk):
+    with pytest.raises(StreamError):
+        _parse(body, chunk)
+
+
+@pytest.mark.parametrize("chunk", [1, 1 << 20])
+@pytest.mark.parametrize("body", [b'{"entities": {"id": 1}}', b'{"entities": null}', b'{"entities": 1}'])
+def test_entities_not_an_array_is_rejected(body, chunk):
+    with pytest.raises(StreamError):
+        _parse(body, chunk)
+
+
+@pytest.mark.parametrize("entities", ['[{"id": 1},]', '{}'])
+def test_invalid_entities_answer_422(entities):
+    body = json.dumps({**game_state(2), "entities": None}).replace("null", entities, 1)
+    with TestClient(Wrapper.configure(RecordingBot(), stream=True)) as client:
+        assert client.post("/tick", content=body).status_code == 422
+
+
+def test_reuse_entities_is_rejected():
+    with pytest.raises(ValueError):
+        Wrapper.configure(RecordingBot(), stream=True, reuse_entities=True)
+
+
+class WorldBot(RecordingBot):
+    keep_world: ClassVar[bool] = True
+
+
+def test_keep_world_gets_streamed_entities():
+    tick = game_state(30)
+    with TestClient(Wrapper.configure(WorldBot(), stream=True)) as client:
+        assert client.post("/start", json=game_start_state(30)).status_code == 200
+        match = Wrapper._MATCHES[""]
+        assert match.entity_cache is None
+        for x in (1.0, 2.0):
+            tick["entities"][4]["position"]["x"] = x
+            assert client.post("/tick", json=tick).status_code == 200
+            assert match.bot.world.get(tick["entities"][4]["id"]).position.x == x
+        assert len(match.bot.world) == 30
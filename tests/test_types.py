@@ -0,0 +1,49 @@
+import copy
+import json
+from typing import Annotated, List
+
+from pydantic import TypeAdapter
+
+from api.Types import APICommand, APICommandTags, APIGameStartState, APIGameState
+from benchmark.fixtures import commands, game_start_state, game_state
+
+
+def test_game_state_round_trip():
+    raw = game_state(200)
+    state = APIGameState.model_validate(raw)
+    assert json.loads(state.model_dump_json()) == json.loads(json.dumps(raw))
+    assert APIGameState.model_validate_json(state.model_dump_json()) == state
+
+
+def test_commands_are_tagged_by_their_class():
+    adapter = TypeAdapter(List[Annotated[APICommand, APICommandTags]])
+    sent = commands(200)
+    dumped = adapter.dump_python(sent, mode="json")
+    assert [next(iter(command)) for command in dumped] == [APICommandTags.tags[type(command)] for command in sent]
+    assert adapter.validate_python(dumped) == sent
+
+
+def test_index_groups_entities():
+    state = APIGameState.model_validate(game_state(50))
+    index = state.index
+    assert index is state.index
+    assert [entity.id for entity in state.entities] == list(index.by_id)
+    for kind, entities in index.by_kind.items():
+        assert entities == [entity for entity in state.entities if type(entity.specific) is kind]
+    teams = {player.id: player.team for player in state.players}
+    for team, entities in index.by_team.items():
+        assert entities == [entity for entity in state.entities if teams.get(entity.player_entity_id) == team]
+
+
+def test_equality_does_not_depend_on_index():
+    raw = game_state(20)
+    a = APIGameState.model_validate(copy.deepcopy(raw))
+    b = APIGameState.model_validate(copy.deepcopy(raw))
+    a.index
+    assert a == b
+    b.index
+    assert a == b and a.index is not b.index
+    start = APIGameStartState.model_validate(game_start_state(20))
+    other = start.model_copy()
+    start.index
+    assert start == other
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import logging
+import time
+from typing import ClassVar, List
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import Commands, Wrapper
+from api.Types import APICommand, APIGameState
+from api.Watchdog import LateTickPolicy, Watchdog
+from benchmark.fixtures import commands, game_start_state, game_state
+from tests.bots import RecordingBot
+
+DEADLINE_MS = 50.0
+SLOW_S = 0.3
+COMMANDS = commands(4)
+
+
+class SlowBot(RecordingBot):
+    """
+     Stages the first command, then sleeps past the deadline on the first tick, and returns the second one.
+    """
+    calls: ClassVar[List[int]] = []
+
+    def tick(self, state: APIGameState) -> List[APICommand]:
+        self.calls.append(state.current_tick)
+        self.emit(COMMANDS[0])
+        if len(self.calls) == 1:
+            time.sleep(SLOW_S)
+        return [COMMANDS[1]]
+
+
+def _sent(response) -> list:
+    assert response.status_code == 200
+    return response.json()
+
+
+def _encoded(*sent: APICommand) -> list:
+    return json.loads(Commands.encode(sent))
+
+
+def _counter(client: TestClient, name: str) -> int:
+    line = next(line for line in client.get("/metrics").text.splitlines() if line.startswith(name + " "))
+    return int(line.split()[1])
+
+
+def _play(late: LateTickPolicy) -> tuple:
+    SlowBot.calls = []
+    with TestClient(Wrapper.configure(SlowBot(), deadline_ms=DEADLINE_MS, late=late)) as client:
+        overruns = _counter(client, "skylords_deadline_overruns_total")
+        assert client.post("/start", json=game_start_state(10)).status_code == 200
+        began = time.perf_counter()
+        first = _sent(client.post("/tick", json=game_state(10, tick=1)))
+        assert time.perf_counter() - began < SLOW_S
+        time.sleep(SLOW_S * 1.5)
+        second = _sent(client.post("/tick", json=game_state(10, tick=2)))
+        assert _counter(client, "skylords_deadline_overruns_total") == overruns + 1
+    return first, second
+
+
+def test_late_tick_sends_staged_commands():
+    first, second = _play(LateTickPolicy.Discard)
+    assert first == _encoded(COMMANDS[0])
+    assert second == _encoded(COMMANDS[0], COMMANDS[1])
+    assert SlowBot.calls == [1, 2]
+
+
+def test_late_commands_are_carried_over():
+    first, second = _play(LateTickPolicy.CarryOver)
+    assert first == _encoded(COMMANDS[0])
+    assert second == _encoded(COMMANDS[1], COMMANDS[0], COMMANDS[1])
+
+
+def test_busy_bot_skips_ticks():
+    SlowBot.calls = []
+    with TestClient(Wrapper.configure(SlowBot(), deadline_ms=DEADLINE_MS)) as client:
+        skipped = _counter(client, "skylords_ticks_skipped_total")
+        assert client.post("/start", json=game_start_state(10)).status_code == 200
+        assert _sent(client.post("/tick", json=game_state(10, tick=1))) == _encoded(COMMANDS[0])
+        assert _sent(client.post("/tick", json=game_state(10, tick=2))) == []
+        assert SlowBot.calls == [1]
+        assert _counter(client, "skylords_ticks_skipped_total") == skipped + 1
+
+
+def _run(watchdog: Watchdog, fn, staged: List[APICommand]) -> List[APICommand]:
+    async def tick():
+        sent = await watchdog.tick(1, fn, staged)
+        while watchdog._pending:
+            await asyncio.sleep(0.01)
+        # Done callbacks of the late tick run on the next iteration.
+        await asyncio.sleep(0)
+        return sent
+
+    return asyncio.run(tick())
+
+
+def test_overrun_is_logged(caplog):
+    watchdog = Watchdog(DEADLINE_MS)
+
+    def slow():
+        time.sleep(SLOW_S)
+        return [COMMANDS[0]]
+
+    with caplog.at_level(logging.WARNING, logger="api.Watchdog"):
+        assert _run(watchdog, slow, []) == []
+    assert watchdog.overruns == 1
+    assert [record.levelno for record in caplog.records] == [logging.WARNING]
+    assert "Tick 1 missed the 50 ms deadline" in caplog.text
+    watchdog.close()
+
+
+def test_failed_overrun_is_logged_and_not_carried(caplog):
+    watchdog = Watchdog(DEADLINE_MS, LateTickPolicy.CarryOver)
+
+    def failing():
+        time.sleep(SLOW_S)
+        raise RuntimeError("bot failed")
+
+    with caplog.at_level(logging.WARNING, logger="api.Watchdog"):
+        assert _run(watchdog, failing, [COMMANDS[2]]) == [COMMANDS[2]]
+    assert [record.levelno for record in caplog.records] == [logging.ERROR]
+    assert "bot failed" in caplog.text
+    assert watchdog._carried == []
+    watchdog.close()
+
+
+def test_in_time_tick_is_not_counted(caplog):
+    watchdog = Watchdog(DEADLINE_MS)
+    with caplog.at_level(logging.WARNING, logger="api.Watchdog"):
+        assert _run(watchdog, lambda: [COMMANDS[3]], []) == [COMMANDS[3]]
+    assert watchdog.overruns == watchdog.skipped == 0 and not caplog.records
+    watchdog.close()
+
+
+@pytest.mark.parametrize("staged", [[], [COMMANDS[0]]])
+def test_async_tick_is_cancelled(staged):
+    watchdog = Watchdog(DEADLINE_MS)
+    cancelled = []
+
+    async def tick():
+        try:
+            await asyncio.sleep(SLOW_S)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return [COMMANDS[1]]
+
+    async def play():
+        return await watchdog.tick_async(1, tick(), staged)
+
+    assert asyncio.run(play()) == staged
+    assert cancelled == [True] and watchdog.overruns == 1
+    watchdog.close()
@@ -0,0 +1,63 @@
+import copy
+import json
+from typing import ClassVar
+
+import pytest
+from fastapi.testclient import TestClient
+
+from api import Wrapper
+from api.Types import APIGameState
+from api.World import WorldState
+from benchmark.fixtures import game_start_state, game_state
+from tests.bots import RecordingBot
+
+
+class WorldBot(RecordingBot):
+    keep_world: ClassVar[bool] = True
+
+
+@pytest.mark.parametrize("options", [{}, {"lazy": True}, {"trusted": True}, {"lazy": True, "fast": True},
+                                     {"trusted": True, "fast": True}])
+def test_start_then_ticks_keep_world(options):
+    app = Wrapper.configure(WorldBot(), **options)
+    start = game_start_state(50)
+    tick = game_state(50)
+    with TestClient(app) as client:
+        assert client.post("/start", json=start).status_code == 200
+        assert client.post("/tick", json=tick).status_code == 200
+        world = Wrapper._MATCHES[""].bot.world
+        assert len(world) == 50
+        tick["entities"][0]["position"]["x"] = -1.0
+        tick["current_tick"] += 1
+        assert client.post("/tick", json=tick).status_code == 200
+        assert world.changed == {tick["entities"][0]["id"]}
+        assert world.get(tick["entities"][0]["id"]).position.x == -1.0
+
+
+def test_unchanged_entities_are_skipped_by_identity():
+    raw = game_state(20)
+    first = APIGameState.model_validate(copy.deepcopy(raw))
+    world = WorldState()
+    world.update(first)
+    kept = world.get(raw["entities"][3]["id"])
+    second = first.model_copy()
+    second.entities = list(first.entities)
+    second.entities[3] = second.entities[3].model_copy(update={"job": 1 if kept.job != 1 else 2})
+    world.update(second)
+    assert world.changed == {kept.id}
+    assert world.get(kept.id) is kept and kept.job == second.entities[3].job
+    world.update(second)
+    assert world.changed == set()
+
+
+def test_changed_fields_are_written_into_kept_entities():
+    raw = game_state(20)
+    world = WorldState()
+    world.update(APIGameState.model_validate(json.loads(json.dumps(raw))))
+    kept = world.get(raw["entities"][0]["id"])
+    raw["entities"][0]["position"]["z"] = 7.0
+    del raw["entities"][1]
+    world.update(APIGameState.model_validate(raw))
+    assert world.get(kept.id) is kept and kept.position.z == 7.0
+    assert world.changed == {kept.id}
+    assert len(world.removed) == 1
@@ -0,0 +1,64 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from api import Wrapper
+from benchmark.fixtures import game_start_state, game_state
+from tests.bots import RecordingBot
+
+MODES = {
+    "default": {},
+    "fast": {"fast": True},
+    "trusted": {"trusted": True},
+    "lazy": {"lazy": True},
+    "stream": {"stream": True},
+    "trusted-stream": {"trusted": True, "stream": True},
+    "reuse": {"reuse_entities": True},
+    "trusted-reuse": {"trusted": True, "reuse_entities": True},
+}
+
+
+def _client(options: dict) -> TestClient:
+    return TestClient(Wrapper.configure(RecordingBot(), **options))
+
+
+def _assert_422(response):
+    assert response.status_code == 422
+    assert all(error["loc"][0] == "body" for error in response.json()["detail"])
+
+
+@pytest.mark.parametrize("options", MODES.values(), ids=MODES.keys())
+@pytest.mark.parametrize("endpoint", ["start", "tick"])
+def test_malformed_json(options, endpoint):
+    with _client(options) as client:
+        _assert_422(client.post(f"/{endpoint}", content=b'{"current_tick": '))
+        _assert_422(client.post(f"/m1/{endpoint}", content=b"\xff"))
+
+
+@pytest.mark.parametrize("options", MODES.values(), ids=MODES.keys())
+def test_missing_field(options):
+    start = game_start_state(5)
+    del start["your_player_id"]
+    tick = game_state(5)
+    del tick["current_tick"]
+    with _client(options) as client:
+        _assert_422(client.post("/start", json=start))
+        _assert_422(client.post("/tick", json=tick))
+
+
+@pytest.mark.parametrize("options", [MODES["default"], MODES["trusted"], MODES["trusted-stream"],
+                                     MODES["trusted-reuse"]], ids=["default", "trusted", "trusted-stream",
+                                                                   "trusted-reuse"])
+def test_missing_entity_field(options):
+    tick = game_state(5)
+    del tick["entities"][2]["position"]
+    with _client(options) as client:
+        response = client.post("/tick", json=tick)
+    _assert_422(response)
+
+
+def test_validation_errors_are_located_in_the_body():
+    tick = game_state(5)
+    tick["entities"][3]["job"] = "walking"
+    with _client({}) as client:
+        error, = client.post("/tick", json=tick).json()["detail"]
+    assert error["loc"][:4] == ["body", "entities", 3, "job"]